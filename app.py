@@ -1,7 +1,5 @@
 import streamlit as st
 from pages.login import login_page
-from pages.user_dashboard_2 import user_dashboard
-from pages.admin_dashboard_2 import admin_dashboard
 
 # Initialize session vars if not set
 if "logged_in" not in st.session_state:
@@ -10,11 +8,13 @@ if "logged_in" not in st.session_state:
     st.session_state.name = None
     st.session_state.email = None
 
-# Navigation
+# Navigation (dashboards are imported lazily so the login page doesn't pay for pandas/plotly)
 if not st.session_state.logged_in:
     login_page()
 else:
     if st.session_state.role == "admin":
+        from pages.admin_dashboard_2 import admin_dashboard
         admin_dashboard()
     else:
+        from pages.user_dashboard_2 import user_dashboard
         user_dashboard()
@@ -1,18 +1,33 @@
 from __future__ import annotations
+import hashlib
 import io
+import os
+import shutil
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Union
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # pyarrow is optional; everything below has a pandas fallback
+    pa = pc = pacsv = None
 from utils.admin_utils import (
     load_users, save_users,
-    load_user_inputs, save_user_inputs,
+    load_user_inputs, save_user_inputs, replace_user_inputs_from_csv,
     load_psychologists, save_psychologists, append_psychologist,
     load_feedback, save_feedback, clear_feedback,
+    count_psychologists, PSYCH_FILE,
+    USERS_DTYPES, PSYCH_DTYPES,
 )
+from utils.downsample import lttb_indices
 
 # ----------------- Page Setup -----------------
 st.set_page_config(page_title="MindPulse • Admin Studio", page_icon="🧰", layout="wide")
@@ -31,11 +46,26 @@ st.markdown(
 )
 
 # ----------------- Caching Helpers -----------------
+RISK_COLS = {"stress_level", "anxiety_level", "depression_level"}
+RISK_LEVELS = ["stress_level", "anxiety_level", "depression_level"]
+RISK_WEIGHTS = np.array([0.45, 0.35, 0.20])
+
 @st.cache_data(show_spinner=False)
 def _safe_load_users() -> pd.DataFrame:
     try:
         df = load_users()
-        return df if df is not None else pd.DataFrame()
+        if df is None:
+            return pd.DataFrame()
+        # One lower-cased "name<TAB>email" column, so the Users search is a single substring scan
+        cols = [c for c in df.columns if c.lower() in ("name", "email")]
+        if cols:
+            blob = df[cols[0]].fillna("").astype(str)
+            for col in cols[1:]:
+                blob = blob + "\t" + df[col].fillna("").astype(str)
+            df = df.assign(_blob=blob.str.lower())
+        if "role" in df.columns:
+            df = df.assign(role=df["role"].astype("category"))  # a handful of distinct roles
+        return df
     except Exception:
         return pd.DataFrame()
 
@@ -46,18 +76,52 @@ def _safe_load_inputs() -> pd.DataFrame:
         df = load_user_inputs()
         if df is None:
             return pd.DataFrame()
-        if "timestamp" in df.columns:
-            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-        for col in ["stress_level","anxiety_level","depression_level","sleep_hours"]:
+        # load_user_inputs() hands out a shared cached frame, so derive a new one instead of mutating.
+        # It normally arrives typed already (see admin_utils._typed_user_inputs); only coerce what isn't.
+        conv = {}
+        if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+            conv["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        for col in ["stress_level","anxiety_level","depression_level","sleep_hours","risk"]:
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+                conv[col] = pd.to_numeric(df[col], errors="coerce")
+        if "email" in df.columns:
+            # Few distinct users, many rows: group/filter on integer codes instead of strings
+            conv["email"] = df["email"].astype("category")
+        for col in ("gender", "occupation"):
             if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce")
+                conv[col] = df[col].astype("category")
+        df = df.assign(**conv)
+        if "timestamp" in df.columns:
+            # Calendar keys used by the sparklines and analytics, derived once per load
+            ts = df["timestamp"].to_numpy(dtype="datetime64[ns]")
+            nat = np.isnat(ts)
+            days = ts.astype("datetime64[D]")
+            df["_date"] = days
+            df["_weekday"] = np.where(nat, -1, (days.astype(np.int64) + 3) % 7).astype(np.int8)  # Monday=0
+            df["_hour"] = np.where(nat, -1, ts.astype("datetime64[h]").astype(np.int64) % 24).astype(np.int8)
+        if RISK_COLS.issubset(df.columns):
+            # Risk and its bucket code are derived once per load and ride on the cached frame
+            risk = _risk_from_levels(df)
+            if "risk" in df.columns:
+                # Submissions carry their risk from write time (admin saves and uploads recompute
+                # it from the levels); only legacy rows without one (NaN) are computed here
+                stored = df["risk"].to_numpy(dtype=np.float64, na_value=np.nan)
+                risk = np.where(np.isnan(stored), risk, stored)
+            df["_risk"] = risk
+            df["_bucket"] = _bucket_codes(risk)
+        if "timestamp" in df.columns:
+            # Time-sorted once (NaT last) so recent windows are a binary search; the original row
+            # labels are kept, so merges/saves that sort by index keep the file's order
+            df = df.sort_values("timestamp", kind="mergesort", na_position="last")
         return df
     except Exception:
         return pd.DataFrame()
 
 
-@st.cache_data(show_spinner=False)
+@st.cache_resource(show_spinner=False)
 def _safe_load_psych() -> pd.DataFrame:
+    # Small, read-only reference table: shared by identity instead of pickled/copied per hit
+    # (callers must not mutate it in place)
     try:
         df = load_psychologists()
         return df if df is not None else pd.DataFrame()
@@ -71,34 +135,249 @@ def _safe_load_feedback() -> pd.DataFrame:
         df = load_feedback()
         if df is None:
             return pd.DataFrame()
+        # load_feedback() hands out a shared cached frame, so derive a new one instead of mutating
+        conv = {}
         if "timestamp" in df.columns:
-            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+            conv["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
         if "rating" in df.columns:
-            df["rating"] = pd.to_numeric(df["rating"], errors="coerce")
-        return df
+            rating = pd.to_numeric(df["rating"], errors="coerce")
+            try:
+                rating = rating.astype("Int8")  # 1–5 stars: one byte per row, NA kept
+            except (TypeError, ValueError):
+                pass  # non-integer ratings stay float
+            conv["rating"] = rating
+        return df.assign(**conv)
     except Exception:
         return pd.DataFrame()
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _psych_count_cached(mtime: float) -> int:
+    return count_psychologists()
+
+
+def _psych_count() -> int:
+    try:
+        mtime = os.path.getmtime(PSYCH_FILE)
+    except OSError:
+        mtime = 0.0
+    return _psych_count_cached(mtime)
+
+
+_LOADERS = {
+    "users": _safe_load_users,
+    "inputs": _safe_load_inputs,
+    "psych": _safe_load_psych,
+    "feedback": _safe_load_feedback,
+}
+
+
+def _session_frame(name: str) -> pd.DataFrame:
+    """Frame parked in session state after its first load, so reruns skip the cache lookup entirely."""
+    key = f"admin_{name}_df"
+    if key not in st.session_state:
+        st.session_state[key] = _LOADERS[name]()
+    return st.session_state[key]
+
+
+def _invalidate(*names: str) -> None:
+    """Drop the parked frame and its cache entry after the underlying CSV was written."""
+    for name in names:
+        st.session_state.pop(f"admin_{name}_df", None)
+        _LOADERS[name].clear()
+
 # ----------------- Utilities -----------------
 
-def _csv_bytes(df: pd.DataFrame) -> bytes:
+def _second_timestamps(tbl: "pa.Table") -> "pa.Table":
+    """Whole-second timestamp columns as "YYYY-mm-dd HH:MM:SS" strings, the stored format
+    (Arrow would write them with a ".000000" fraction). Columns with sub-second values are kept."""
+    for i, field in enumerate(tbl.schema):
+        if pa.types.is_timestamp(field.type) and field.type.tz is None:
+            try:
+                col = pc.cast(pc.cast(tbl.column(i), pa.timestamp("s")), pa.string())
+            except pa.ArrowInvalid:  # a fraction would be lost
+                continue
+            tbl = tbl.set_column(i, field.name, col)
+    return tbl
+
+
+def _encode_csv(df: pd.DataFrame) -> bytes:
+    # Downloads: pyarrow's C++ CSV writer is much faster than pandas' Python-level one; mixed-type
+    # object columns it can't convert fall back to to_csv. Backups use _backup_csv instead.
+    if pacsv is not None:
+        try:
+            buf = io.BytesIO()
+            tbl = _second_timestamps(pa.Table.from_pandas(df, preserve_index=False))
+            pacsv.write_csv(tbl, buf, write_options=pacsv.WriteOptions(quoting_style="needed"))
+            return buf.getvalue()
+        except (pa.ArrowException, TypeError, ValueError):
+            pass
     return df.to_csv(index=False).encode("utf-8")
 
 
-def _excel_pack(sheets: Dict[str, pd.DataFrame]) -> bytes:
-    import io
-    import pandas as pd
+def _backup_csv(df: pd.DataFrame) -> bytes:
+    # Byte-for-byte what the savers write (to_csv), so restoring a backup doesn't change the format
+    return df.to_csv(index=False).encode("utf-8")
+
 
-    output = io.BytesIO()
+def _fingerprint(df: pd.DataFrame) -> str:
+    """Digest of every cell, the index and the column names of `df`.
 
-    # 1) Choose a working engine
+    Streamlit's own hash of a large frame only looks at a sample of its rows, so a single
+    edited cell can go unnoticed; this hashes all of them (vectorized, far cheaper than encoding).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(map(str, df.columns))).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _csv_bytes_cached(_df: pd.DataFrame, fingerprint: str) -> bytes:
+    return _encode_csv(_df)
+
+
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    # Download bytes, cached on the full content fingerprint so unchanged tables reuse them across
+    # reruns. Backups use _backup_csv and never come from a cache.
+    try:
+        fingerprint = _fingerprint(df)
+    except TypeError:  # unhashable cell values (e.g. lists): encode without caching
+        return _encode_csv(df)
+    return _csv_bytes_cached(df, fingerprint)
+
+
+def _csv_bytes_parallel(tables: Dict[str, pd.DataFrame]) -> Dict[str, bytes]:
+    """Encode several tables at once on a thread pool (uncached: worker threads have no script context)."""
+    with ThreadPoolExecutor(max_workers=max(1, len(tables))) as ex:
+        return dict(zip(tables, ex.map(_encode_csv, tables.values())))
+
+
+FrameOrLoader = Union[pd.DataFrame, Callable[[], pd.DataFrame]]
+
+
+def _csv_download(label: str, df: FrameOrLoader, file_name: str, key: str) -> None:
+    """Download button that only encodes `df` once the admin asks for it via a "Prepare" click.
+
+    `df` may also be a zero-argument loader, which is then only called on that click.
+    """
+    if st.button(f"Prepare {label}", key=f"{key}_prepare"):
+        frame = df() if callable(df) else df
+        st.download_button(f"Download {label}", _csv_bytes(frame), file_name=file_name, mime="text/csv", key=key)
+
+
+def _contains(s: pd.Series, needle: str) -> np.ndarray:
+    """Case-insensitive literal substring mask, via Arrow's match_substring kernel when available.
+
+    For categoricals only the distinct categories are matched, then broadcast through the codes.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        cat_mask = _contains(pd.Series(s.cat.categories.astype(str)), needle)
+        codes = s.cat.codes.to_numpy()
+        return (codes >= 0) & cat_mask[codes]
+    if pc is not None:
+        try:
+            arr = pa.array(s, from_pandas=True)
+            if not pa.types.is_string(arr.type) and not pa.types.is_large_string(arr.type):
+                arr = pc.cast(arr, pa.string())
+            mask = pc.fill_null(pc.match_substring(arr, needle, ignore_case=True), False)
+            return mask.to_numpy(zero_copy_only=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            pass
+    return s.astype(str).str.contains(needle, case=False, regex=False, na=False).to_numpy()
+
+
+def _merge_edits(full: pd.DataFrame, shown: pd.DataFrame, edited: pd.DataFrame) -> pd.DataFrame:
+    """Fold a data_editor result for the subset `shown` back into `full`.
+
+    Rows of `shown` missing from `edited` were deleted, rows whose index is in `shown` were
+    edited in place, and any other row was added in the editor. Rows outside `shown` are
+    kept untouched, so saving a filtered view never drops the rest of the table.
+    """
+    in_view = edited.index.isin(shown.index)
+    kept = pd.concat([full.drop(index=shown.index), edited[in_view]]).sort_index(kind="mergesort")
+    return pd.concat([kept, edited[~in_view]], ignore_index=True)
+
+
+def _read_uploaded_csv(upload, dtypes: Dict[str, str], required: List[str] = ()) -> pd.DataFrame:
+    """Parse an uploaded CSV with pyarrow's multi-threaded reader, falling back to the C parser.
+
+    The upload is spooled to a temp file in 1 MB blocks first, so both parsers read from a
+    real file on disk rather than from the in-memory upload buffer. Every column is kept (the
+    upload replaces the whole table); those declared in `dtypes` are parsed with that type, and a
+    file missing any `required` column is rejected up front.
+    """
+    upload.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tf:
+        shutil.copyfileobj(upload, tf, length=1024 * 1024)
+    try:
+        header = pd.read_csv(tf.name, nrows=0).columns
+        missing = [c for c in required if c not in header]
+        if missing:
+            raise ValueError(f"Uploaded CSV is missing required column(s): {', '.join(missing)}")
+        typed = {c: dtypes[c] for c in header if c in dtypes}
+        if pacsv is not None:
+            try:
+                tbl = pacsv.read_csv(
+                    tf.name,
+                    read_options=pacsv.ReadOptions(block_size=8 << 20, use_threads=True),
+                    convert_options=pacsv.ConvertOptions(
+                        column_types={c: pa.type_for_alias(t) for c, t in typed.items()},
+                    ),
+                )
+                # Arrow-backed columns go straight to the saver without another conversion pass
+                return tbl.to_pandas(types_mapper=pd.ArrowDtype)
+            except (pa.ArrowInvalid, ValueError, TypeError):
+                pass
+        return pd.read_csv(tf.name, engine="c", dtype=typed, low_memory=False, cache_dates=True)
+    finally:
+        os.remove(tf.name)
+
+
+def _handle_csv_upload(label: str, key: str, dtypes: Dict[str, str], required: List[str],
+                       saver, frame: str, success: str) -> None:
+    """Upload widget that replaces a stored table: parse, validate, save and invalidate `frame`."""
+    up = st.file_uploader(label, type=["csv"], key=key)
+    if not up:
+        return
+    # The uploader keeps returning the same file on every rerun; only process it once
+    file_id = getattr(up, "file_id", None)
+    if file_id is not None and st.session_state.get(f"{key}_processed") == file_id:
+        return
+    try:
+        new_df = _read_uploaded_csv(up, dtypes, required)
+        saver(new_df); _invalidate(frame)
+        st.session_state[f"{key}_processed"] = file_id
+        st.success(success)
+    except Exception as e:
+        st.error(e)
+
+
+EXCEL_SPOOL_MAX = 8 << 20  # workbooks larger than this are spooled to a temp file on disk
+
+
+def _spooled_bytes(buf) -> bytes:
+    """Read a finished spooled workbook back in one go and release its temp file."""
+    try:
+        buf.seek(0)
+        return buf.read()
+    finally:
+        buf.close()
+
+
+def _excel_pack(sheets: Dict[str, pd.DataFrame]) -> bytes:
+    # Spooled rather than BytesIO: a big workbook goes to disk while it is being zipped,
+    # and is read back exactly once (BytesIO.getvalue() would hold a second in-RAM copy)
+    output = tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX)
+
+    # 1) Choose a working engine; xlsxwriter streams rows, openpyxl keeps the whole workbook in RAM
     engine = None
     try:
-        import openpyxl  # noqa: F401
-        engine = "openpyxl"
+        import xlsxwriter  # noqa: F401
+        engine = "xlsxwriter"
     except Exception:
-        try:  
-            engine = "xlsxwriter"
+        try:
+            import openpyxl  # noqa: F401
+            engine = "openpyxl"
         except Exception:
             engine = None
 
@@ -121,8 +400,33 @@ def _excel_pack(sheets: Dict[str, pd.DataFrame]) -> bytes:
     if engine is None:
         # Last-ditch fallback: return a tiny CSV-like bytes to avoid crashing the UI
         # (or raise a friendly error). Recommended: install openpyxl or XlsxWriter.
+        output.close()
         return pd.DataFrame({"Info": ["Install openpyxl or XlsxWriter to export Excel."]}).to_csv(index=False).encode("utf-8")
 
+    if engine == "xlsxwriter":
+        # constant_memory flushes each row as it is written, so peak memory doesn't grow with rows
+        wb = xlsxwriter.Workbook(output, {"constant_memory": True, "strings_to_urls": False,
+                                          "nan_inf_to_errors": True})
+        used_names = set()
+        for name, frame in (sheets or {}).items():
+            df = frame if frame is not None else pd.DataFrame()
+            ws = wb.add_worksheet(_safe_sheet_name(str(name), used_names))
+            ws.write_row(0, 0, [str(c) for c in df.columns])
+            # Plain Python values only: datetimes as text, missing values as blank cells
+            conv = {c: df[c].dt.strftime("%Y-%m-%d %H:%M:%S") for c in df.columns
+                    if pd.api.types.is_datetime64_any_dtype(df[c])}
+            cells = df.assign(**conv).astype(object)
+            cells = cells.where(cells.notna(), None)
+            for i, row in enumerate(cells.itertuples(index=False, name=None), start=1):
+                ws.write_row(i, 0, row)
+        # Guarantee at least one visible sheet
+        if not used_names:
+            ws = wb.add_worksheet("Summary")
+            ws.write_row(0, 0, ["Info"])
+            ws.write_row(1, 0, ["No data available in this export window."])
+        wb.close()
+        return _spooled_bytes(output)
+
     with pd.ExcelWriter(output, engine=engine) as writer:
         wrote_any = False
         used_names = set()
@@ -140,30 +444,168 @@ def _excel_pack(sheets: Dict[str, pd.DataFrame]) -> bytes:
                 writer, sheet_name="Summary", index=False
             )
 
-    return output.getvalue()
+    return _spooled_bytes(output)
+
+def _date_slice(df: pd.DataFrame, tcol: str, date_from: date, date_to: date) -> pd.DataFrame:
+    """Rows whose `tcol` falls on a day in [date_from, date_to], inclusive.
+
+    One int64-backed datetime64 range check on the raw ndarray instead of building a Python
+    `date` per row via `.dt.date`; the NaT check is fused into the same mask, so no dropna pass.
+    """
+    if df is None or df.empty or tcol not in df.columns:
+        return df
+    arr = df[tcol].to_numpy(dtype="datetime64[ns]")
+    lo = np.datetime64(date_from, "ns")
+    hi = np.datetime64(date_to + timedelta(days=1), "ns")
+    mask = ~np.isnat(arr)
+    mask &= arr >= lo
+    mask &= arr < hi
+    return df.iloc[mask]
+
+
+def _since(df: pd.DataFrame, cutoff: datetime) -> pd.DataFrame:
+    """Rows of the time-sorted inputs frame at or after `cutoff`, found by binary search (NaT rows excluded)."""
+    ts = df["timestamp"].to_numpy(dtype="datetime64[ns]")
+    n_valid = len(ts) - int(np.isnat(ts).sum())
+    start = int(np.searchsorted(ts[:n_valid], np.datetime64(cutoff, "ns")))
+    return df.iloc[start:n_valid]
+
+
+def _public(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` as stored: without the derived "_"-prefixed helper columns and with categorical
+    columns back as plain objects. Used for editing, export and saving."""
+    hidden = [c for c in df.columns if str(c).startswith("_")]
+    out = df.drop(columns=hidden) if hidden else df
+    cats = {c: out[c].astype(object) for c in out.columns if isinstance(out[c].dtype, pd.CategoricalDtype)}
+    return out.assign(**cats) if cats else out
+
+
+def _risk_from_levels(df: pd.DataFrame) -> np.ndarray:
+    """Weighted 0–10 risk of numeric level columns: one (n, 3) float64 block times RISK_WEIGHTS.
+
+    Clipped and rounded to 2 decimals like user_utils._weighted_risk, so a stored risk and a
+    recomputed one agree and e.g. (8, 8, 3) lands on exactly 7.0 for the thresholds.
+    """
+    block = df[RISK_LEVELS].to_numpy(dtype=np.float64, na_value=np.nan)
+    risk = block @ RISK_WEIGHTS
+    np.clip(risk, 0, 10, out=risk)
+    np.round(risk, 2, out=risk)
+    return risk
+
 
 def _compute_risk(df: pd.DataFrame) -> pd.Series:
-    needed = {"stress_level","anxiety_level","depression_level"}
-    if not needed.issubset(df.columns):
+    if "_risk" in df.columns:
+        return df["_risk"]
+    if not RISK_COLS.issubset(df.columns):
         return pd.Series(index=df.index, dtype=float)
-    comp = df[list(needed)].apply(pd.to_numeric, errors="coerce")
-    return (comp["stress_level"]*0.45 + comp["anxiety_level"]*0.35 + comp["depression_level"]*0.20).clip(0,10)
+    # Coerce only the level columns that aren't numeric yet, then one matrix-vector pass
+    levels = df[RISK_LEVELS]
+    conv = {c: pd.to_numeric(levels[c], errors="coerce") for c in RISK_LEVELS
+            if not pd.api.types.is_numeric_dtype(levels[c])}
+    return pd.Series(_risk_from_levels(levels.assign(**conv)), index=df.index)
+
+
+RISK_BUCKETS = ["Low", "Moderate", "High"]
+
+
+def _bucket_codes(arr: np.ndarray) -> np.ndarray:
+    # Same right-closed edges as the app's (-0.001,4], (4,7], (7,10]; risk is already clipped to 0..10.
+    # int8 codes into RISK_BUCKETS, -1 for NaN.
+    codes = np.digitize(arr, [4.0, 7.0], right=True).astype(np.int8)
+    codes[np.isnan(arr)] = -1
+    return codes
+
+
+def _risk_bucket(series: pd.Series, codes: Optional[pd.Series] = None) -> pd.Series:
+    """Risk buckets as an ordered Categorical; pass precomputed `codes` (the loader's _bucket) to skip binning."""
+    if codes is None:
+        codes = _bucket_codes(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    else:
+        codes = np.asarray(codes, dtype=np.int8)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=RISK_BUCKETS, ordered=True), index=series.index)
+
 
+def _daily_stats(days: pd.Series, values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Per-day row counts and per-day mean of `values`, from one sorted np.unique scan plus bincounts."""
+    d = days.to_numpy(dtype="datetime64[D]")
+    v = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    ok = ~np.isnat(d)
+    uniq, inv, counts = np.unique(d[ok], return_inverse=True, return_counts=True)
+    inv, v = inv.ravel(), v[ok]
+    has = ~np.isnan(v)
+    sums = np.bincount(inv[has], weights=v[has], minlength=len(uniq))
+    n = np.bincount(inv[has], minlength=len(uniq))
+    index = pd.DatetimeIndex(uniq, name="date")
+    means = np.divide(sums, n, out=np.full(len(uniq), np.nan), where=n > 0)
+    return pd.Series(counts, index=index), pd.Series(means, index=index)
 
-def _risk_bucket(series: pd.Series) -> pd.Series:
-    return pd.cut(series, bins=[-0.001,4,7,10], labels=["Low","Moderate","High"])  # aligned to app
+
+SPARK_POINTS = 500
 
 
 def _spark_area(s: pd.Series, title: str) -> Optional[go.Figure]:
     if s is None or len(s) == 0:
         return None
     df = s.rename_axis("date").reset_index(name="value")
-    fig = px.area(df, x="date", y="value", title=title)
-    fig.update_layout(height=160, margin=dict(l=20,r=20,t=40,b=20))
+    if len(df) > SPARK_POINTS:
+        # Long ranges: keep the visually significant points only (LTTB)
+        x = df["date"]
+        xnum = x.to_numpy(dtype="datetime64[ns]").astype(np.int64) if pd.api.types.is_datetime64_any_dtype(x) else x.to_numpy(dtype=np.float64)
+        df = df.iloc[lttb_indices(xnum, df["value"].to_numpy(dtype=np.float64), SPARK_POINTS)]
+    # WebGL trace: drawn on a canvas instead of an SVG path per point
+    fig = go.Figure(go.Scattergl(x=df["date"], y=df["value"], mode="lines", fill="tozeroy"))
+    fig.update_layout(title=title, height=160, margin=dict(l=20,r=20,t=40,b=20))
     fig.update_yaxes(rangemode="tozero")
     return fig
 
 
+PAGE = 100
+
+
+def _paged_dataframe(df: FrameOrLoader, key: str, title: str, page_size: int = PAGE,
+                     rows: Optional[int] = None) -> None:
+    """Render one page of `df`, so only `page_size` rows are serialized to the browser per rerun.
+
+    The table stays collapsed behind a checkbox until the admin asks for it. `df` may also be a
+    zero-argument loader (pass the known row count as `rows`); it is only called once expanded.
+    """
+    if rows is None:
+        rows = len(df)
+    if not st.checkbox(f"Show {title} ({rows:,} rows)", value=False, key=f"{key}_show"):
+        return
+    if callable(df):
+        df = df()
+    pages = max(1, -(-len(df) // page_size))
+    page = 1
+    if pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+    start = (int(page) - 1) * page_size
+    st.dataframe(df.iloc[start:start + page_size], use_container_width=True)
+    if pages > 1:
+        st.caption(f"Rows {start + 1:,}–{min(start + page_size, len(df)):,} of {len(df):,}")
+
+
+BACKUP_KEEP = 5
+
+
+def _store_backup(bytes_blob: bytes, note: str = "") -> str:
+    """Keep a compressed copy of the stored inputs in session state so the admin can restore/download it.
+
+    Only the last BACKUP_KEEP backups are kept, so a long editing session doesn't grow without bound.
+    """
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backups = st.session_state.setdefault("admin_user_inputs_backups", {})
+    notes = st.session_state.setdefault("admin_user_inputs_last_backup_note", {})
+    backups.pop(ts, None)  # re-insert as newest
+    backups[ts] = zlib.compress(bytes_blob, 6)
+    notes[ts] = note
+    while len(backups) > BACKUP_KEEP:
+        oldest = next(iter(backups))
+        del backups[oldest]
+        notes.pop(oldest, None)
+    return ts
+
+
 def _kpi_card(label: str, value: str, sub: Optional[str] = None):
     with st.container(border=True):
         st.markdown(f"<div style='font-size:0.9rem;color:#64748b'>{label}</div>", unsafe_allow_html=True)
@@ -182,46 +624,13 @@ def _role_guard():
 
 # ----------------- Main -----------------
 
-def admin_dashboard():
-    # HERO
-    st.markdown("<div class='mp-hero'><h1>🧰 MindPulse Admin Studio</h1><p>Manage users, data and insights with a friendly, visual console.</p></div>", unsafe_allow_html=True)
-    # _logout_button()
-    _role_guard()
-    st.markdown("---")
-
-    # === Sidebar Filters & Actions ===
-    with st.sidebar:
-        st.subheader("Filters & Actions")
-        refresh = st.button("🔄 Refresh data")
-        if refresh:
-            _safe_load_users.clear(); _safe_load_inputs.clear(); _safe_load_psych.clear(); _safe_load_feedback.clear()
-            st.toast("Data refreshed")
-        # Global date filter for inputs/feedback analytics
-        default_from = date.today() - timedelta(days=30)
-        date_from = st.date_input("From", value=default_from)
-        date_to = st.date_input("To", value=date.today())
-        risk_min = st.slider("Min risk threshold (alerts)", 0.0, 10.0, 7.0, 0.5)
-        st.caption("Risk uses same weights as the user app.")
+# Fragments (Streamlit >= 1.33) rerun on their own when a widget inside them changes; on older
+# versions this degrades to a plain function and the whole page reruns as before.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
 
-    # Load data
-    users_df = _safe_load_users()
-    inputs_df = _safe_load_inputs()
-    psych_df  = _safe_load_psych()
-    feedback_df = _safe_load_feedback()
 
-    # Apply sidebar date filter to inputs/feedback views
-    def _date_slice(df: pd.DataFrame, tcol: str) -> pd.DataFrame:
-        if df is None or df.empty or tcol not in df.columns:
-            return df
-        d = df.copy()
-        d = d.dropna(subset=[tcol])
-        d = d[(d[tcol].dt.date >= date_from) & (d[tcol].dt.date <= date_to)]
-        return d
-
-    inputs_win = _date_slice(inputs_df, "timestamp")
-    feedback_win = _date_slice(feedback_df, "timestamp")
-
-    # === KPIs ===
+def _render_kpis(users_df: pd.DataFrame, inputs_win: pd.DataFrame, feedback_win: pd.DataFrame,
+                 date_from: date, date_to: date) -> None:
     c1, c2, c3, c4 = st.columns(4)
     with c1:
         _kpi_card("Registered Users", f"{len(users_df):,}")
@@ -232,9 +641,9 @@ def admin_dashboard():
     with c3:
         avg_risk = None
         if not inputs_win.empty:
-            r = _compute_risk(inputs_win)
-            if not r.dropna().empty:
-                avg_risk = round(r.mean(), 2)
+            r = _compute_risk(inputs_win).to_numpy(dtype=np.float64, na_value=np.nan)
+            if not np.isnan(r).all():
+                avg_risk = round(float(np.nanmean(r)), 2)
         _kpi_card("Avg Risk", f"{avg_risk if avg_risk is not None else '—'}", "windowed")
         st.markdown("-----")
     with c4:
@@ -243,142 +652,132 @@ def admin_dashboard():
 
     # KPI Sparklines
     colsp1, colsp2 = st.columns(2)
-    with colsp1:
-        # submissions per day spark
-        if not inputs_win.empty and "timestamp" in inputs_win.columns:
-            s = inputs_win.dropna(subset=["timestamp"]).timestamp.dt.date.value_counts().sort_index()
-            fig = _spark_area(s, "Submissions per day")
+    if not inputs_win.empty and "_date" in inputs_win.columns:
+        per_day, risk_per_day = _daily_stats(inputs_win["_date"], _compute_risk(inputs_win))
+        with colsp1:
+            # submissions per day spark
+            fig = _spark_area(per_day, "Submissions per day")
             if fig: st.plotly_chart(fig, use_container_width=True)
-    with colsp2:
-        # average risk per day spark
-        if not inputs_win.empty and "timestamp" in inputs_win.columns:
-            tmp = inputs_win.dropna(subset=["timestamp"]).copy()
-            tmp["date"] = tmp["timestamp"].dt.date
-            tmp["risk"] = _compute_risk(tmp)
-            g = tmp.groupby("date")["risk"].mean().round(2)
-            fig = _spark_area(g, "Avg risk per day")
+        with colsp2:
+            # average risk per day spark
+            fig = _spark_area(risk_per_day.round(2), "Avg risk per day")
             if fig: st.plotly_chart(fig, use_container_width=True)
 
-    # === NAV ===
-    tabs = st.tabs(["Users", "User Inputs", "Psychologists", "Feedback", "Analytics", "Exports"])
 
-    # USERS
-    with tabs[0]:
-        st.header("👥 Registered Users")
-        if users_df.empty:
-            st.info("No users found.")
-        else:
-            fcol1, fcol2 = st.columns([2,1])
-            with fcol1:
-                q = st.text_input("Search (name or email)")
-            with fcol2:
-                edit = st.toggle("Inline edit", value=False)
-            df = users_df.copy()
-            if q:
-                mask = pd.Series(False, index=df.index)
-                for col in [c for c in df.columns if c.lower() in ("name","email")]:
-                    mask = mask | df[col].astype(str).str.contains(q, case=False, na=False)
-                df = df[mask]
-            if edit:
-                edited = st.data_editor(df, use_container_width=True, num_rows="dynamic")
-                if st.button("💾 Save Users", type="primary"):
-                    try:
-                        save_users(edited)
-                        st.success("Users updated.")
-                        st.balloons(); _safe_load_users.clear()
-                    except Exception as e:
-                        st.error(e)
-            else:
-                st.dataframe(df, use_container_width=True)
-            st.download_button("Download Users CSV", _csv_bytes(df), file_name="users.csv", mime="text/csv")
-            up = st.file_uploader("Upload Updated Users CSV", type=["csv"], key="users_upload")
-            if up:
+@_fragment
+def _users_tab() -> None:
+    # Searching/editing users only reruns this tab, not the KPIs and charts above
+    users_df = _session_frame("users")
+    st.header("👥 Registered Users")
+    if users_df.empty:
+        st.info("No users found.")
+    else:
+        fcol1, fcol2 = st.columns([2,1])
+        with fcol1:
+            q = st.text_input("Search (name or email)", key="users_search")
+        with fcol2:
+            edit = st.toggle("Inline edit", value=False, key="users_inline_edit")
+        df = _public(users_df)
+        if q and "_blob" in users_df.columns:
+            df = df[_contains(users_df["_blob"], q)]
+        if edit:
+            edited = st.data_editor(df, use_container_width=True, num_rows="dynamic", key="users_editor")
+            if st.button("💾 Save Users", type="primary", key="users_save"):
                 try:
-                    new_df = pd.read_csv(up)
-                    save_users(new_df); _safe_load_users.clear()
-                    st.success("✅ Users updated successfully!")
+                    save_users(edited)
+                    st.success("Users updated.")
+                    st.balloons(); _invalidate("users")
                 except Exception as e:
                     st.error(e)
-
-    # USER INPUTS
-    # USER INPUTS (enhanced: inline edit + row-level fallback + backups + audit)
-    with tabs[1]:
-        st.header("🧠 User Mental Health Data (editable)")
-        if inputs_df.empty:
-            st.info("No user inputs found.")
         else:
-            # Filters (same semantics as before)
-            cfil1, cfil2, cfil3 = st.columns(3)
-            with cfil1:
-                email_filter = st.text_input("Email contains…")
-            with cfil2:
-                min_sleep = st.slider("Min sleep (hrs)", 0, 12, 0)
-            with cfil3:
-                max_sleep = st.slider("Max sleep (hrs)", 0, 12, 12)
-
-            df = inputs_win.copy()
-            if email_filter and "email" in df.columns:
-                df = df[df["email"].astype(str).str.contains(email_filter, case=False, na=False)]
-            if "sleep_hours" in df.columns:
-                df = df[(df["sleep_hours"] >= min_sleep) & (df["sleep_hours"] <= max_sleep)]
-
-            st.markdown("**Preview (windowed)**")
-            st.dataframe(df, use_container_width=True)
-
-            # Exports / uploads (unchanged)
-            st.download_button("Download User Inputs CSV", _csv_bytes(df), file_name="user_inputs.csv", mime="text/csv")
-            up2 = st.file_uploader("Upload Updated User Inputs CSV", type=["csv"], key="user_inputs_upload")
-            if up2:
-                try:
-                    new_inputs_df = pd.read_csv(up2)
-                    # backup existing before overwrite
-                    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    st.session_state.setdefault("admin_user_inputs_backups", {})[ts] = _csv_bytes(inputs_df)
-                    save_user_inputs(new_inputs_df); _safe_load_inputs.clear()
-                    st.success("✅ User inputs updated successfully (from uploaded CSV)!")
-                except Exception as e:
-                    st.error(e)
-
-            st.markdown("---")
-            st.subheader("Admin edit / update / delete")
-            st.caption("You can edit the whole table inline (best), or edit/delete a single row below (fallback). Backups are created automatically before saves.")
-
-            # Prepare audit log structure in session
-            if "admin_user_inputs_audit" not in st.session_state:
-                st.session_state["admin_user_inputs_audit"] = []  # list of dicts: {when, actor, action, details}
-
-            # Create a backup helper (store last backup bytes in session so admin can restore/download)
-            def _store_backup(bytes_blob: bytes, note: str = ""):
-                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                st.session_state.setdefault("admin_user_inputs_backups", {})[ts] = bytes_blob
-                st.session_state.setdefault("admin_user_inputs_last_backup_note", {})[ts] = note
-                return ts
-
-            # Inline editor (preferred) — only if data editor exists
-            editor_supported = hasattr(st, "data_editor") or hasattr(st, "experimental_data_editor")
-            if editor_supported:
-                st.markdown("**Inline table editor (recommended)**")
+            _paged_dataframe(df, "users", "users table")
+        _csv_download("Users CSV", df, "users.csv", "users_download")
+        _handle_csv_upload("Upload Updated Users CSV", "users_upload", USERS_DTYPES,
+                           ["email", "password", "role", "name"], save_users, "users",
+                           "✅ Users updated successfully!")
+
+
+@_fragment
+def _inputs_tab(date_from: date, date_to: date) -> None:
+    # Filters, editor and row edits only rerun this tab, not the KPIs and charts above
+    inputs_df = _session_frame("inputs")
+    inputs_win = _date_slice(inputs_df, "timestamp", date_from, date_to)
+    st.header("🧠 User Mental Health Data (editable)")
+    if inputs_df.empty:
+        st.info("No user inputs found.")
+    else:
+        # Filters (same semantics as before)
+        cfil1, cfil2, cfil3 = st.columns(3)
+        with cfil1:
+            email_filter = st.text_input("Email contains…", key="inputs_email_filter")
+        with cfil2:
+            min_sleep = st.slider("Min sleep (hrs)", 0, 12, 0, key="inputs_min_sleep")
+        with cfil3:
+            max_sleep = st.slider("Max sleep (hrs)", 0, 12, 12, key="inputs_max_sleep")
+
+        # One boolean mask, updated in place, then a single take
+        mask = np.ones(len(inputs_win), dtype=bool)
+        if email_filter and "email" in inputs_win.columns:
+            mask &= _contains(inputs_win["email"], email_filter)
+        if "sleep_hours" in inputs_win.columns:
+            sleep = inputs_win["sleep_hours"].to_numpy(dtype=np.float32, na_value=np.nan)
+            mask &= sleep >= min_sleep
+            mask &= sleep <= max_sleep
+        df = inputs_win.iloc[mask]
+
+        st.markdown("**Preview (windowed)**")
+        _paged_dataframe(lambda: _public(df), "inputs", "submissions table", page_size=500, rows=len(df))
+
+        # Exports / bulk replace (for small tweaks, use the inline editor below instead)
+        _csv_download("User Inputs CSV", lambda: _public(df), "user_inputs.csv", "inputs_download")
+        up2 = st.file_uploader("Upload Updated User Inputs CSV", type=["csv"], key="user_inputs_upload")
+        # The uploader keeps returning the same file on every rerun; only back up and replace once
+        if up2 and st.session_state.get("user_inputs_upload_processed") != getattr(up2, "file_id", None):
+            try:
+                # backup existing before overwrite
+                _store_backup(_backup_csv(_public(inputs_df).sort_index(kind="mergesort")), note="Before CSV upload")
+                replace_user_inputs_from_csv(up2); _invalidate("inputs")
+                st.session_state["user_inputs_upload_processed"] = getattr(up2, "file_id", None)
+                st.success("✅ User inputs updated successfully (from uploaded CSV)!")
+            except Exception as e:
+                st.error(e)
+
+        st.markdown("---")
+        st.subheader("Admin edit / update / delete")
+        st.caption("Edit the rows shown above inline and save — no need to download and re-upload the CSV — or edit/delete a single row below (fallback). Rows hidden by the filters are kept as they are. Backups are created automatically before saves.")
+
+        # Prepare audit log structure in session
+        if "admin_user_inputs_audit" not in st.session_state:
+            st.session_state["admin_user_inputs_audit"] = []  # list of dicts: {when, actor, action, details}
+
+        # Inline editor (preferred) — only if data editor exists
+        editor_supported = hasattr(st, "data_editor") or hasattr(st, "experimental_data_editor")
+        if editor_supported:
+            st.markdown("**Inline table editor (recommended)**")
+            # The editor ships every row it is given to the browser; build it only on request
+            if st.toggle(f"Load all {len(df):,} filtered rows for editing", value=False, key="inputs_editor_on"):
                 try:
                     # Use newer name if available
                     if hasattr(st, "data_editor"):
-                        edited = st.data_editor(df, num_rows="dynamic")
+                        edited = st.data_editor(_public(df), num_rows="dynamic", key="inputs_editor")
                     else:
-                        edited = st.experimental_data_editor(df, num_rows="dynamic")
+                        edited = st.experimental_data_editor(_public(df), num_rows="dynamic", key="inputs_editor")
                     if st.button("💾 Save edited table", key="save_edited_table"):
                         try:
                             # Save backup of current stored inputs (not the filtered df)
-                            b = _csv_bytes(inputs_df)
+                            b = _backup_csv(_public(inputs_df).sort_index(kind="mergesort"))
                             backup_ts = _store_backup(b, note="Before inline save")
+                            # edited only covers the filtered rows; merge it back into the full table
+                            merged = _merge_edits(_public(inputs_df), df, edited)
                             actor = st.session_state.get("name", "admin")
                             st.session_state["admin_user_inputs_audit"].append({
                                 "when": datetime.now().isoformat(),
                                 "actor": actor,
                                 "action": "save_table",
-                                "details": f"Inline save; backup_ts={backup_ts}; rows_before={len(inputs_df)} rows_after={len(edited)}",
+                                "details": f"Inline save; backup_ts={backup_ts}; rows_before={len(inputs_df)} rows_after={len(merged)}",
                             })
-                            # Persist edited — note: edited may be filtered subset; prefer to save the full edited as-is
-                            save_user_inputs(edited)
-                            _safe_load_inputs.clear()
+                            save_user_inputs(merged)
+                            _invalidate("inputs")
                             st.success("✅ All edits saved.")
                             # st.experimental_rerun()
                         except Exception as e:
@@ -389,149 +788,283 @@ def admin_dashboard():
                     st.exception(e)
                     editor_supported = False
 
-            # Fallback: row-level edit / delete (safe)
-            if not editor_supported:
-                st.markdown("**Row-level edit & delete (fallback)**")
-                working_df = inputs_df.reset_index(drop=False).rename(columns={"index": "_orig_index"})
-                if working_df.empty:
-                    st.info("No submissions to edit.")
-                else:
-                    # build readable labels
-                    def _label_row(r):
-                        email = r.get("email", "")
-                        when = r.get("timestamp", "")
-                        who = str(email)[:32] if email else str(r.get("_orig_index"))
-                        return f"{r.get('_orig_index')} — {who} @ {when}"
-
-                    labels = [ _label_row(working_df.iloc[i]) for i in range(len(working_df)) ]
-                    sel = st.selectbox("Select submission to edit or delete", options=list(range(len(working_df))), format_func=lambda i: labels[i], key="select_input_row")
-
-                    row = working_df.iloc[sel]
-                    st.markdown("### Selected submission (read-only preview)")
-                    st.json(row.to_dict())
-
-                    st.markdown("### Edit fields")
-                    # choose editable fields (extend as needed)
-                    e_email = st.text_input("Email", value=str(_safe_get(row, "email", "")), key="edit_email")
-                    e_name = st.text_input("Name", value=str(_safe_get(row, "name", "")), key="edit_name")
-                    e_timestamp = st.text_input("Timestamp", value=str(_safe_get(row, "timestamp", "")), key="edit_ts")
-                    e_stress = st.number_input("Stress (0-10)", min_value=0.0, max_value=10.0, value=float(_safe_get(row, "stress_level", 0)), step=0.1, key="edit_stress")
-                    e_anxiety = st.number_input("Anxiety (0-10)", min_value=0.0, max_value=10.0, value=float(_safe_get(row, "anxiety_level", 0)), step=0.1, key="edit_anx")
-                    e_depression = st.number_input("Depression (0-10)", min_value=0.0, max_value=10.0, value=float(_safe_get(row, "depression_level", 0)), step=0.1, key="edit_dep")
-                    e_sleep = st.number_input("Sleep hours", min_value=0.0, max_value=24.0, value=float(_safe_get(row, "sleep_hours", 0)), step=0.1, key="edit_sleep")
-
-                    col_save, col_delete = st.columns([1,1])
-                    with col_save:
-                        if st.button("💾 Save changes to this submission", key=f"save_row_{sel}"):
+        # Fallback: row-level edit / delete (safe)
+        if not editor_supported:
+            st.markdown("**Row-level edit & delete (fallback)**")
+            # The loader sorts by timestamp; saves go back in the file's own row order
+            stored_df = _public(inputs_df).sort_index(kind="mergesort")
+            working_df = stored_df.reset_index(drop=False).rename(columns={"index": "_orig_index"})
+            if working_df.empty:
+                st.info("No submissions to edit.")
+            else:
+                # build readable labels
+                def _label_row(r):
+                    email = r.get("email", "")
+                    when = r.get("timestamp", "")
+                    who = str(email)[:32] if email else str(r.get("_orig_index"))
+                    return f"{r.get('_orig_index')} — {who} @ {when}"
+
+                labels = [ _label_row(working_df.iloc[i]) for i in range(len(working_df)) ]
+                sel = st.selectbox("Select submission to edit or delete", options=list(range(len(working_df))), format_func=lambda i: labels[i], key="select_input_row")
+
+                row = working_df.iloc[sel]
+                st.markdown("### Selected submission (read-only preview)")
+                st.json(row.to_dict())
+
+                st.markdown("### Edit fields")
+                # choose editable fields (extend as needed)
+                e_email = st.text_input("Email", value=str(_safe_get(row, "email", "")), key="edit_email")
+                e_name = st.text_input("Name", value=str(_safe_get(row, "name", "")), key="edit_name")
+                e_timestamp = st.text_input("Timestamp", value=str(_safe_get(row, "timestamp", "")), key="edit_ts")
+                e_stress = st.number_input("Stress (0-10)", min_value=0.0, max_value=10.0, value=float(_safe_get(row, "stress_level", 0)), step=0.1, key="edit_stress")
+                e_anxiety = st.number_input("Anxiety (0-10)", min_value=0.0, max_value=10.0, value=float(_safe_get(row, "anxiety_level", 0)), step=0.1, key="edit_anx")
+                e_depression = st.number_input("Depression (0-10)", min_value=0.0, max_value=10.0, value=float(_safe_get(row, "depression_level", 0)), step=0.1, key="edit_dep")
+                e_sleep = st.number_input("Sleep hours", min_value=0.0, max_value=24.0, value=float(_safe_get(row, "sleep_hours", 0)), step=0.1, key="edit_sleep")
+
+                col_save, col_delete = st.columns([1,1])
+                with col_save:
+                    if st.button("💾 Save changes to this submission", key=f"save_row_{sel}"):
+                        try:
+                            idx = int(row["_orig_index"])
+                            df_copy = stored_df.copy()
+                            # backup before change
+                            backup_ts = _store_backup(_backup_csv(stored_df), note=f"Row-edit before idx={idx}")
+                            # apply updates if columns exist
+                            if "email" in df_copy.columns: df_copy.loc[idx, "email"] = e_email
+                            if "name" in df_copy.columns: df_copy.loc[idx, "name"] = e_name
+                            if "timestamp" in df_copy.columns:
+                                try:
+                                    df_copy.loc[idx, "timestamp"] = pd.to_datetime(e_timestamp)
+                                except Exception:
+                                    df_copy.loc[idx, "timestamp"] = e_timestamp
+                            if "stress_level" in df_copy.columns: df_copy.loc[idx, "stress_level"] = float(e_stress)
+                            if "anxiety_level" in df_copy.columns: df_copy.loc[idx, "anxiety_level"] = float(e_anxiety)
+                            if "depression_level" in df_copy.columns: df_copy.loc[idx, "depression_level"] = float(e_depression)
+                            if "sleep_hours" in df_copy.columns: df_copy.loc[idx, "sleep_hours"] = float(e_sleep)
+                            # record audit
+                            actor = st.session_state.get("name", "admin")
+                            st.session_state["admin_user_inputs_audit"].append({
+                                "when": datetime.now().isoformat(),
+                                "actor": actor,
+                                "action": "edit_row",
+                                "details": f"idx={idx}; backup_ts={backup_ts}",
+                            })
+                            # persist
+                            save_user_inputs(df_copy)
+                            _invalidate("inputs")
+                            st.success("✅ Submission updated.")
+                            # st.experimental_rerun()
+                        except Exception as e:
+                            st.error("Failed to update submission.")
+                            st.exception(e)
+
+                with col_delete:
+                    confirm = st.checkbox("Confirm delete", key=f"confirm_delete_{sel}")
+                    if st.button("🗑️ Delete this submission", key=f"delete_row_{sel}"):
+                        if not confirm:
+                            st.warning("Please check 'Confirm delete' to enable deletion.")
+                        else:
                             try:
                                 idx = int(row["_orig_index"])
-                                df_copy = inputs_df.copy()
-                                # backup before change
-                                backup_ts = _store_backup(_csv_bytes(inputs_df), note=f"Row-edit before idx={idx}")
-                                # apply updates if columns exist
-                                if "email" in df_copy.columns: df_copy.loc[idx, "email"] = e_email
-                                if "name" in df_copy.columns: df_copy.loc[idx, "name"] = e_name
-                                if "timestamp" in df_copy.columns:
-                                    try:
-                                        df_copy.loc[idx, "timestamp"] = pd.to_datetime(e_timestamp)
-                                    except Exception:
-                                        df_copy.loc[idx, "timestamp"] = e_timestamp
-                                if "stress_level" in df_copy.columns: df_copy.loc[idx, "stress_level"] = float(e_stress)
-                                if "anxiety_level" in df_copy.columns: df_copy.loc[idx, "anxiety_level"] = float(e_anxiety)
-                                if "depression_level" in df_copy.columns: df_copy.loc[idx, "depression_level"] = float(e_depression)
-                                if "sleep_hours" in df_copy.columns: df_copy.loc[idx, "sleep_hours"] = float(e_sleep)
-                                # record audit
+                                # backup
+                                backup_ts = _store_backup(_backup_csv(stored_df), note=f"Before delete idx={idx}")
+                                df_copy = stored_df.drop(index=idx).reset_index(drop=True)
+                                # audit
                                 actor = st.session_state.get("name", "admin")
                                 st.session_state["admin_user_inputs_audit"].append({
                                     "when": datetime.now().isoformat(),
                                     "actor": actor,
-                                    "action": "edit_row",
+                                    "action": "delete_row",
                                     "details": f"idx={idx}; backup_ts={backup_ts}",
                                 })
-                                # persist
                                 save_user_inputs(df_copy)
-                                _safe_load_inputs.clear()
-                                st.success("✅ Submission updated.")
+                                _invalidate("inputs")
+                                st.success("✅ Submission deleted.")
                                 # st.experimental_rerun()
                             except Exception as e:
-                                st.error("Failed to update submission.")
+                                st.error("Failed to delete submission.")
                                 st.exception(e)
 
-                    with col_delete:
-                        confirm = st.checkbox("Confirm delete", key=f"confirm_delete_{sel}")
-                        if st.button("🗑️ Delete this submission", key=f"delete_row_{sel}"):
-                            if not confirm:
-                                st.warning("Please check 'Confirm delete' to enable deletion.")
-                            else:
-                                try:
-                                    idx = int(row["_orig_index"])
-                                    # backup
-                                    backup_ts = _store_backup(_csv_bytes(inputs_df), note=f"Before delete idx={idx}")
-                                    df_copy = inputs_df.copy().drop(index=idx).reset_index(drop=True)
-                                    # audit
-                                    actor = st.session_state.get("name", "admin")
-                                    st.session_state["admin_user_inputs_audit"].append({
-                                        "when": datetime.now().isoformat(),
-                                        "actor": actor,
-                                        "action": "delete_row",
-                                        "details": f"idx={idx}; backup_ts={backup_ts}",
-                                    })
-                                    save_user_inputs(df_copy)
-                                    _safe_load_inputs.clear()
-                                    st.success("✅ Submission deleted.")
-                                    # st.experimental_rerun()
-                                except Exception as e:
-                                    st.error("Failed to delete submission.")
-                                    st.exception(e)
-
-            # Show last backup download and audit log
-            st.markdown("---")
-            backups = st.session_state.get("admin_user_inputs_backups", {})
-            if backups:
-                last_ts = sorted(backups.keys())[-1]
-                st.markdown(f"**Last backup:** {last_ts} — {st.session_state.get('admin_user_inputs_last_backup_note', {}).get(last_ts, '')}")
-                st.download_button("Download last backup", data=backups[last_ts], file_name=f"user_inputs_backup_{last_ts}.csv", mime="text/csv")
-            else:
-                st.caption("No backups created during this admin session yet. Backups are created whenever you save or delete entries.")
+        # Show last backup download and audit log
+        st.markdown("---")
+        backups = st.session_state.get("admin_user_inputs_backups", {})
+        if backups:
+            last_ts = sorted(backups.keys())[-1]
+            st.markdown(f"**Last backup:** {last_ts} — {st.session_state.get('admin_user_inputs_last_backup_note', {}).get(last_ts, '')}")
+            st.download_button("Download last backup", data=zlib.decompress(backups[last_ts]), file_name=f"user_inputs_backup_{last_ts}.csv", mime="text/csv", key="inputs_backup_download")
+        else:
+            st.caption("No backups created during this admin session yet. Backups are created whenever you save or delete entries.")
 
-            # Audit trail preview
-            st.markdown("**Audit trail (session)**")
-            audit = st.session_state.get("admin_user_inputs_audit", [])
-            if audit:
-                st.table(pd.DataFrame(audit).sort_values("when", ascending=False).reset_index(drop=True))
+        # Audit trail preview
+        st.markdown("**Audit trail (session)**")
+        audit = st.session_state.get("admin_user_inputs_audit", [])
+        if audit:
+            st.table(pd.DataFrame(audit).sort_values("when", ascending=False).reset_index(drop=True))
+        else:
+            st.caption("No audit entries recorded in this session yet.")
+
+        st.markdown("---")
+        st.caption("Editing here changes production user_inputs storage. Consider downloading a backup before bulk edits.")
+
+
+def _render_analytics(inputs_df: pd.DataFrame, inputs_win: pd.DataFrame, risk_min: float) -> None:
+    st.header("📈 Analytics & Insights")
+    now = datetime.now()
+    # Risk mix over time (stacked area by share)
+    if not inputs_win.empty and "_date" in inputs_win.columns:
+        # assign() shares the untouched columns with the cached frame instead of copying them
+        risk = _compute_risk(inputs_win)
+        df = inputs_win.assign(date=inputs_win["_date"], risk=risk,
+                               bucket=_risk_bucket(risk, inputs_win.get("_bucket")))
+        grp = df.groupby(["date","bucket"], observed=True).size().rename("count").reset_index()
+        totals = grp.groupby("date")["count"].transform("sum")
+        grp["pct"] = (grp["count"] / totals * 100).round(1)
+
+        a1, a2 = st.columns(2)
+        with a1:
+            # Scattergl has no stackgroup, so stack by hand: each bucket fills down to the previous one
+            pct = grp.pivot(index="date", columns="bucket", values="pct").fillna(0)
+            top = pct.cumsum(axis=1)
+            fig_mix = go.Figure()
+            for i, bucket in enumerate(pct.columns):
+                fig_mix.add_trace(go.Scattergl(
+                    x=pct.index, y=top[bucket], name=str(bucket), mode="lines",
+                    fill="tozeroy" if i == 0 else "tonexty",
+                    customdata=pct[bucket], hovertemplate="%{customdata}%",
+                ))
+            fig_mix.update_layout(title="Risk mix over time (% of submissions)", legend_title_text="Risk",
+                                  xaxis_title="date", yaxis_title="%")
+            fig_mix.update_yaxes(range=[0,100])
+            st.plotly_chart(fig_mix, use_container_width=True)
+
+        with a2:
+            # Submission timing heatmap (weekday x hour)
+            # Fixed 7x24 grid filled by one scatter-add over the int8 keys (NaT rows carry -1)
+            wd = df["_weekday"].to_numpy()
+            hr = df["_hour"].to_numpy()
+            ok = wd >= 0
+            grid = np.zeros((7, 24), dtype=np.int32)
+            np.add.at(grid, (wd[ok], hr[ok]), 1)
+            # Integer weekday keys become names only for display
+            order = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
+            pivot = pd.DataFrame(grid, index=order, columns=range(24))
+            fig_heat = px.imshow(pivot, aspect="auto", title="Submission timing heatmap",
+                                 labels=dict(x="Hour", y="Weekday", color="Submissions"))
+            st.plotly_chart(fig_heat, use_container_width=True)
+
+        # One 30-day slice and one risk array feed both the alerts and the ranking below; the
+        # frame is time-sorted, so the 7-day alerts window is just the tail of the 30-day one
+        timed = not inputs_df.empty and "timestamp" in inputs_df.columns
+        if timed:
+            last30 = _since(inputs_df, now - timedelta(days=30))
+            risk30 = _compute_risk(last30).to_numpy(dtype=np.float64, na_value=np.nan)
+            ts30 = last30["timestamp"].to_numpy(dtype="datetime64[ns]")
+            start7 = int(np.searchsorted(ts30, np.datetime64(now - timedelta(days=7), "ns")))
+
+        st.subheader("⚠️ High‑risk alerts (last 7 days)")
+        if timed:
+            hit = start7 + np.flatnonzero(risk30[start7:] >= risk_min)
+            # Top 50 by risk picked on the numpy positions, so only those rows are ever materialised
+            top = hit[np.argsort(-risk30[hit], kind="stable")[:50]]
+            alerts = last30.iloc[top].assign(risk=risk30[top])
+            show_cols = [c for c in ["timestamp","email","name","risk","stress_level","anxiety_level","depression_level","sleep_hours"] if c in alerts.columns]
+            st.dataframe(alerts[show_cols], use_container_width=True)
+            st.caption("Showing up to 50 most recent high‑risk submissions. Adjust threshold in the sidebar.")
+        else:
+            st.info("No timestamped inputs to compute alerts.")
+
+        st.subheader("🏅 Top at‑risk users (avg risk in last 30 days)")
+        if timed:
+            key = "email" if "email" in last30.columns else ("name" if "name" in last30.columns else None)
+            if key:
+                # Integer-coded users + two bincounts instead of a groupby; NaN risks are skipped like mean()
+                codes, users = pd.factorize(last30[key].to_numpy())
+                ok = (codes >= 0) & ~np.isnan(risk30)
+                sums = np.bincount(codes[ok], weights=risk30[ok], minlength=len(users))
+                counts = np.bincount(codes[ok], minlength=len(users))
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    avg = sums / counts
+                top = np.argsort(-avg, kind="stable")[:25]
+                agg = pd.DataFrame({"User": np.asarray(users)[top], "Avg Risk": np.round(avg[top], 2)})
+                st.dataframe(agg, use_container_width=True)
             else:
-                st.caption("No audit entries recorded in this session yet.")
+                st.caption("No email/name column to aggregate by user.")
+        else:
+            st.info("Not enough recent data for ranking.")
+    else:
+        st.info("No inputs in selected window.")
 
-            st.markdown("---")
-            st.caption("Editing here changes production user_inputs storage. Consider downloading a backup before bulk edits.")
+
+def admin_dashboard():
+    # HERO
+    st.markdown("<div class='mp-hero'><h1>🧰 MindPulse Admin Studio</h1><p>Manage users, data and insights with a friendly, visual console.</p></div>", unsafe_allow_html=True)
+    # _logout_button()
+    _role_guard()
+    st.markdown("---")
+
+    # === Sidebar Filters & Actions ===
+    with st.sidebar:
+        st.subheader("Filters & Actions")
+        refresh = st.button("🔄 Refresh data", key="refresh_data")
+        if refresh:
+            _invalidate(*_LOADERS)
+            st.toast("Data refreshed")
+        # Global date filter for inputs/feedback analytics
+        default_from = date.today() - timedelta(days=30)
+        date_from = st.date_input("From", value=default_from, key="filter_date_from")
+        date_to = st.date_input("To", value=date.today(), key="filter_date_to")
+        risk_min = st.slider("Min risk threshold (alerts)", 0.0, 10.0, 7.0, 0.5, key="filter_risk_min")
+        st.caption("Risk uses same weights as the user app.")
+
+    # Load data
+    users_df = _session_frame("users")
+    inputs_df = _session_frame("inputs")
+    feedback_df = _session_frame("feedback")
+
+    # Apply sidebar date filter to inputs/feedback views
+    inputs_win = _date_slice(inputs_df, "timestamp", date_from, date_to)
+    feedback_win = _date_slice(feedback_df, "timestamp", date_from, date_to)
+
+    _render_kpis(users_df, inputs_win, feedback_win, date_from, date_to)
+
+    # === NAV ===
+    tabs = st.tabs(["Users", "User Inputs", "Psychologists", "Feedback", "Analytics", "Exports"])
+
+    # USERS
+    with tabs[0]:
+        _users_tab()
+
+    # USER INPUTS
+    # USER INPUTS (enhanced: inline edit + row-level fallback + backups + audit)
+    with tabs[1]:
+        _inputs_tab(date_from, date_to)
 
     # PSYCHOLOGISTS
     with tabs[2]:
         st.header("🩺 Psychologists & Counsellors")
-        if psych_df.empty:
+        # Only the row count is needed up front; the table itself is parsed when it is expanded
+        n_psych = _psych_count()
+        st.metric("Psychologists", f"{n_psych:,}")
+        load_psych = lambda: _session_frame("psych")
+        if n_psych == 0:
             st.info("No psychologists found.")
         else:
             pcol1, pcol2 = st.columns([2,1])
             with pcol1:
-                st.dataframe(psych_df, use_container_width=True)
+                _paged_dataframe(load_psych, "psych", "psychologists table", rows=n_psych)
             with pcol2:
-                st.download_button("Download Psychologists CSV", _csv_bytes(psych_df), file_name="psychologists.csv", mime="text/csv")
-            uploaded_psych = st.file_uploader("Upload Updated Psychologists CSV", type=["csv"], key="psych_upload")
-            if uploaded_psych:
-                try:
-                    new_psych_df = pd.read_csv(uploaded_psych)
-                    save_psychologists(new_psych_df); _safe_load_psych.clear()
-                    st.success("✅ Psychologists updated successfully!")
-                except Exception as e:
-                    st.error(e)
+                _csv_download("Psychologists CSV", load_psych, "psychologists.csv", "psych_download")
+            _handle_csv_upload("Upload Updated Psychologists CSV", "psych_upload", PSYCH_DTYPES,
+                               ["name", "email", "phone"], save_psychologists, "psych",
+                               "✅ Psychologists updated successfully!")
 
         st.subheader("➕ Add a Psychologist")
         with st.form("add_psych_form", clear_on_submit=True):
-            name = st.text_input("Name")
-            specialization = st.text_input("Specialization")
-            emailp = st.text_input("Email")
-            phone = st.text_input("Phone")
-            booking = st.text_input("Booking URL (optional)")
+            name = st.text_input("Name", key="psych_add_name")
+            specialization = st.text_input("Specialization", key="psych_add_specialization")
+            emailp = st.text_input("Email", key="psych_add_email")
+            phone = st.text_input("Phone", key="psych_add_phone")
+            booking = st.text_input("Booking URL (optional)", key="psych_add_booking")
             submitted = st.form_submit_button("Add Psychologist")
             if submitted:
                 if name and specialization and emailp and phone:
@@ -544,7 +1077,7 @@ def admin_dashboard():
                             "booking_url": booking,
                         })
                         st.success(f"✅ {name} added successfully!")
-                        st.balloons(); _safe_load_psych.clear()
+                        st.balloons(); _invalidate("psych")
                     except Exception as e:
                         st.error(e)
                 else:
@@ -557,101 +1090,55 @@ def admin_dashboard():
             st.info("No feedback yet.")
         else:
             st.dataframe(feedback_win, use_container_width=True)
-            st.download_button("Download Feedback CSV", _csv_bytes(feedback_win), file_name="user_feedback.csv", mime="text/csv")
+            _csv_download("Feedback CSV", feedback_win, "user_feedback.csv", "feedback_download")
 
             fcol1, fcol2 = st.columns(2)
             with fcol1:
                 if "rating" in feedback_win.columns:
-                    fig = px.histogram(feedback_win.dropna(subset=["rating"]), x="rating", nbins=5, title="Ratings distribution")
+                    # Only the rating column is handed over; no NaN-filtered copy of the whole window
+                    ratings = feedback_win["rating"].dropna()
+                    fig = px.histogram(x=ratings.to_numpy(), nbins=5, title="Ratings distribution", labels={"x": "rating"})
                     fig.update_xaxes(dtick=1, range=[0.5,5.5])
                     st.plotly_chart(fig, use_container_width=True)
             with fcol2:
                 if "timestamp" in feedback_win.columns:
-                    d = feedback_win.dropna(subset=["timestamp"]).assign(date=lambda d: d["timestamp"].dt.date)
-                    vol = d.groupby("date").size().reset_index(name="feedback")
+                    days = feedback_win["timestamp"].to_numpy(dtype="datetime64[D]")
+                    uniq, counts = np.unique(days[~np.isnat(days)], return_counts=True)
+                    vol = pd.DataFrame({"date": uniq, "feedback": counts})
                     if not vol.empty:
                         st.plotly_chart(px.area(vol, x="date", y="feedback", markers=True, title="Feedback volume"), use_container_width=True)
 
-            if st.button("🗑 Clear All Feedback", type="secondary"):
-                clear_feedback(); _safe_load_feedback.clear()
+            if st.button("🗑 Clear All Feedback", type="secondary", key="feedback_clear"):
+                clear_feedback(); _invalidate("feedback")
                 st.success("✅ All feedback cleared.")
 
     # ANALYTICS
     with tabs[4]:
-        st.header("📈 Analytics & Insights")
-        # Risk mix over time (stacked area by share)
-        if not inputs_win.empty and "timestamp" in inputs_win.columns:
-            df = inputs_win.dropna(subset=["timestamp"]).copy()
-            df["date"] = df["timestamp"].dt.date
-            df["risk"] = _compute_risk(df)
-            df["bucket"] = _risk_bucket(df["risk"]).astype(str)
-            grp = df.groupby(["date","bucket"]).size().rename("count").reset_index()
-            totals = grp.groupby("date")["count"].transform("sum")
-            grp["pct"] = (grp["count"] / totals * 100).round(1)
-
-            a1, a2 = st.columns(2)
-            with a1:
-                fig_mix = px.area(grp, x="date", y="pct", color="bucket",
-                                  title="Risk mix over time (% of submissions)",
-                                  labels={"pct":"%","bucket":"Risk"})
-                fig_mix.update_yaxes(range=[0,100])
-                st.plotly_chart(fig_mix, use_container_width=True)
-
-            with a2:
-                # Submission timing heatmap (weekday x hour)
-                timing = df.copy()
-                timing["weekday"] = timing["timestamp"].dt.day_name()
-                timing["hour"] = timing["timestamp"].dt.hour
-                pivot = timing.pivot_table(index="weekday", columns="hour", values="email" if "email" in timing.columns else "date", aggfunc="count").fillna(0)
-                # Reorder weekdays
-                order = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
-                pivot = pivot.reindex(order)
-                fig_heat = px.imshow(pivot, aspect="auto", title="Submission timing heatmap",
-                                     labels=dict(x="Hour", y="Weekday", color="Submissions"))
-                st.plotly_chart(fig_heat, use_container_width=True)
-
-            st.subheader("⚠️ High‑risk alerts (last 7 days)")
-            recent = inputs_df.copy()
-            if not recent.empty and "timestamp" in recent.columns:
-                recent = recent.dropna(subset=["timestamp"]).copy()
-                recent["risk"] = _compute_risk(recent)
-                cutoff = datetime.now() - timedelta(days=7)
-                alerts = recent[(recent["timestamp"] >= cutoff) & (recent["risk"] >= risk_min)]
-                show_cols = [c for c in ["timestamp","email","name","risk","stress_level","anxiety_level","depression_level","sleep_hours"] if c in alerts.columns]
-                st.dataframe(alerts.sort_values("risk", ascending=False)[show_cols].head(50), use_container_width=True)
-                st.caption("Showing up to 50 most recent high‑risk submissions. Adjust threshold in the sidebar.")
-            else:
-                st.info("No timestamped inputs to compute alerts.")
-
-            st.subheader("🏅 Top at‑risk users (avg risk in last 30 days)")
-            last30 = inputs_df.copy()
-            if not last30.empty and "timestamp" in last30.columns:
-                last30 = last30.dropna(subset=["timestamp"]).copy()
-                last30 = last30[last30["timestamp"] >= (datetime.now() - timedelta(days=30))]
-                last30["risk"] = _compute_risk(last30)
-                key = "email" if "email" in last30.columns else ("name" if "name" in last30.columns else None)
-                if key:
-                    agg = last30.groupby(key)["risk"].mean().round(2).sort_values(ascending=False).reset_index()
-                    agg.rename(columns={key:"User", "risk":"Avg Risk"}, inplace=True)
-                    st.dataframe(agg.head(25), use_container_width=True)
-                else:
-                    st.caption("No email/name column to aggregate by user.")
-            else:
-                st.info("Not enough recent data for ranking.")
-        else:
-            st.info("No inputs in selected window.")
+        _render_analytics(inputs_df, inputs_win, risk_min)
 
     # EXPORTS
     with tabs[5]:
         st.header("📦 Exports")
         st.markdown("Download individual CSVs from each tab, or package everything into one Excel workbook.")
-        pack = _excel_pack({
-            "Users": users_df,
-            "UserInputs": inputs_df,
-            "Psychologists": psych_df,
-            "Feedback": feedback_df,
-        })
-        st.download_button("Download All (Excel)", data=pack, file_name=f"mindpulse_export_{datetime.now():%Y%m%d_%H%M%S}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        if st.button("Prepare all CSVs", key="exports_prepare_csvs"):
+            blobs = _csv_bytes_parallel({
+                "users.csv": _public(users_df),
+                "user_inputs.csv": _public(inputs_df),
+                "psychologists.csv": _session_frame("psych"),
+                "user_feedback.csv": feedback_df,
+            })
+            for col, (fname, blob) in zip(st.columns(len(blobs)), blobs.items()):
+                with col:
+                    st.download_button(f"Download {fname}", blob, file_name=fname, mime="text/csv", key=f"exports_{fname}")
+        # The workbook is only built on request, not on every rerun of the page
+        if st.button("Build Excel workbook", key="exports_build_excel"):
+            pack = _excel_pack({
+                "Users": _public(users_df),
+                "UserInputs": _public(inputs_df),
+                "Psychologists": _session_frame("psych"),
+                "Feedback": feedback_df,
+            })
+            st.download_button("Download All (Excel)", data=pack, file_name=f"mindpulse_export_{datetime.now():%Y%m%d_%H%M%S}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="exports_excel_download")
 
     st.markdown("---")
     st.caption("MindPulse Admin Studio • Visual, friendly, and fast. All analytics adapt to your data in real time.")
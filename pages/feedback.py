@@ -2,15 +2,63 @@ import streamlit as st
 import csv
 from datetime import datetime
 import os
+import threading
+from utils.csv_io import append_row, flush, tail_rows
+from utils.user_utils import is_duplicate_feedback
 
 FEEDBACK_FILE = "data/feedback.csv"
 
+_INITED = False
+_INIT_LOCK = threading.Lock()
+
 def init_feedback_file():
-    os.makedirs("data", exist_ok=True)
-    if not os.path.exists(FEEDBACK_FILE):
-        with open(FEEDBACK_FILE, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["timestamp", "email", "name", "rating", "feedback"])  
+    # Runs on every render; the folder/file checks only need to happen once per process
+    global _INITED
+    if _INITED:
+        return
+    with _INIT_LOCK:
+        if _INITED:
+            return
+        os.makedirs("data", exist_ok=True)
+        if not os.path.exists(FEEDBACK_FILE):
+            with open(FEEDBACK_FILE, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["timestamp", "email", "name", "rating", "feedback"])  
+        _INITED = True
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_user_feedback(email, mtime):
+    """Last 5 feedback rows for `email`, oldest first. `mtime` only keys the cache to the file version."""
+    rows = tail_rows(FEEDBACK_FILE, 5, where=lambda row: row.get("email") == email)
+    return [{k: row.get(k, "") for k in ("rating", "feedback", "timestamp")} for row in rows]
+
+def _submit_feedback():
+    """Form callback: runs before the rerun, so the cleared inputs show up on that same rerun."""
+    feedback = st.session_state.feedback_text.strip()
+    if not feedback:
+        st.session_state._feedback_status = ("error", "⚠️ Feedback cannot be empty!")
+        return
+    if is_duplicate_feedback(st.session_state, st.session_state.get("email", "anonymous"), feedback):
+        st.session_state._feedback_status = ("info", "Already submitted — thank you!")
+        return
+    try:
+        append_row(FEEDBACK_FILE, {
+            "timestamp": datetime.now().isoformat(),
+            "email": st.session_state.get("email", "anonymous"),
+            "name": st.session_state.get("name", "Guest"),
+            "rating": st.session_state.rating,
+            "feedback": feedback,
+        })
+    except OSError as e:  # an earlier batch for the file couldn't be written either
+        st.session_state.pop("_last_feedback", None)  # so a retry isn't taken for a double click
+        st.session_state._feedback_status = ("error", f"⚠️ Couldn't save your feedback: {e}")
+        return
+    _load_user_feedback.clear()
+    st.session_state._feedback_status = ("success", "🎉 Thank you for your valuable feedback!")
+
+    # Clear after submit
+    st.session_state.feedback_text = ""
+    st.session_state.rating = 3
 
 def feedback_page():
     st.title("📝 User Feedback")
@@ -22,55 +70,32 @@ def feedback_page():
     if "rating" not in st.session_state:
         st.session_state.rating = 3
 
-    # --- Rating Input (Stars via slider) ---
-    rating = st.slider(
-        "How would you rate your experience? ⭐",
-        1, 5, st.session_state.rating,
-        key="rating"
-    )
+    # Widgets inside a form don't trigger reruns; only the submit does, once
+    with st.form("feedback_form"):
+        # --- Rating Input (Stars via slider) ---
+        st.slider("How would you rate your experience? ⭐", 1, 5, key="rating")
 
-    # --- Feedback Input ---
-    feedback = st.text_area(
-        "Please share your feedback or suggestions:",
-        value=st.session_state.feedback_text,
-        key="feedback_text"
-    )
+        # --- Feedback Input ---
+        st.text_area("Please share your feedback or suggestions:", key="feedback_text")
 
-    # --- Submit Button ---
-    if st.button("✅ Submit Feedback"):
-        if not feedback.strip():
-            st.error("⚠️ Feedback cannot be empty!")
-        else:
-            with open(FEEDBACK_FILE, "a", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    datetime.now().isoformat(),
-                    st.session_state.get("email", "anonymous"),
-                    st.session_state.get("name", "Guest"),
-                    rating,
-                    feedback.strip()
-                ])
-            st.success("🎉 Thank you for your valuable feedback!")
+        # --- Submit Button ---
+        st.form_submit_button("✅ Submit Feedback", on_click=_submit_feedback)
 
-            # Clear after submit
-            st.session_state.feedback_text = ""
-            st.session_state.rating = 3
-            st.experimental_rerun()  # ensures UI resets properly
+    status = st.session_state.pop("_feedback_status", None)
+    if status:
+        getattr(st, status[0])(status[1])
 
     # --- Show Past Feedback (user-specific) ---
     st.subheader("📌 Your Previous Feedback")
     try:
-        with open(FEEDBACK_FILE, "r", encoding="utf-8") as f:
-            reader = list(csv.DictReader(f))
-            user_feedbacks = [
-                row for row in reader 
-                if row["email"] == st.session_state.get("email", "")
-            ]
-            
-            if user_feedbacks:
-                for fb in reversed(user_feedbacks[-5:]):  # show last 5
-                    st.info(f"⭐ {fb['rating']} | {fb['feedback']}  \n🕒 {fb['timestamp']}")
-            else:
-                st.write("No feedback submitted yet.")
+        flush(FEEDBACK_FILE)
+        user_feedbacks = _load_user_feedback(
+            st.session_state.get("email", ""), os.path.getmtime(FEEDBACK_FILE)
+        )
+        if user_feedbacks:
+            for fb in reversed(user_feedbacks):  # show last 5
+                st.info(f"⭐ {fb['rating']} | {fb['feedback']}  \n🕒 {fb['timestamp']}")
+        else:
+            st.write("No feedback submitted yet.")
     except Exception as e:
         st.error(f"Error loading feedback history: {e}")
@@ -1,51 +1,66 @@
 from __future__ import annotations
+import functools
+import hashlib
+import io
 import json
+import os
 from datetime import datetime, timedelta
+from types import MappingProxyType
 from typing import Dict, Any, Optional, List, Tuple
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import streamlit as st
-import random
-from utils.user_utils import save_user_inputs, save_feedback, init_files
-from utils.admin_utils import load_psychologists, load_user_inputs
+try:
+    import orjson
+    # st.plotly_chart serializes every figure with plotly.io.to_json; orjson is much faster
+    pio.json.config.default_engine = "orjson"
+except ImportError:  # optional: plotly and the JSON report fall back to the stdlib encoder
+    orjson = None
+from utils.user_utils import save_user_inputs, save_feedback, init_files, is_duplicate_feedback
+from utils.admin_utils import load_psychologists, load_user_inputs, USER_INPUTS_FILE
+from utils.csv_io import flush as flush_pending
+from utils.downsample import lttb_indices
 
 import streamlit.components.v1 as components
-# Risk colors used by the pill
-_RISK_COLORS = {
+# Risk colors used by the pill (read-only: shared by every session)
+_RISK_COLORS = MappingProxyType({
     "Low": "#16a34a",
-    "Moderate": "#f59e0b",  
+    "Moderate": "#f59e0b",
     "High": "#dc2626",
-}
+})
+
+# Static styles for the hero, pills and KPI values. Emitted once per run together with the
+# hero (an element not re-emitted on a rerun is removed, so it can't be injected only once);
+# the per-element HTML then carries just a class and its own values.
+_DASHBOARD_CSS = """<style>
+.mp-hero{background:linear-gradient(45deg,#07293d,#c098cf);padding:14px;border-radius:12px;color:white}
+.mp-hero-title{font-size:1.2rem;font-weight:700}
+.mp-hero-sub{color:#c7d2fe;font-size:0.92rem}
+.mp-pill{display:inline-block;padding:0.25rem 0.6rem;border-radius:9999px;color:white;font-weight:600}
+.mp-kpi{font-size:2rem;font-weight:700}
+.mp-kpi-sm{font-size:1.6rem;font-weight:700}
+</style>"""
+_HERO_SUB = "Complete the assessment below to receive insights, suggestions, and a downloadable report."
 
 def _pill(text: str, bg: str) -> None:
     """Render a soft rounded pill badge."""
-    st.markdown(
-        f"""
-        <div style="display:inline-block;padding:0.25rem 0.6rem;border-radius:9999px;
-                    background:{bg};color:white;font-weight:600">
-            {text}
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(f'<div class="mp-pill" style="background:{bg}">{text}</div>', unsafe_allow_html=True)
 
 def _metric_card(label: str, value: str, help_text: Optional[str] = None) -> None:
     """Small KPI card. Works on Streamlit >=1.31 (border=True)."""
     try:
         with st.container(border=True):
             st.markdown(f"### {label}")
-            st.markdown(
-                f"<div style='font-size:2rem;font-weight:700'>{value}</div>",
-                unsafe_allow_html=True,
-            )
+            st.markdown(f'<div class="mp-kpi">{value}</div>', unsafe_allow_html=True)
             if help_text:
                 st.caption(help_text)
     except TypeError:
         
         st.markdown(f"**{label}**")
-        st.markdown(f"<div style='font-size:1.6rem;font-weight:700'>{value}</div>", unsafe_allow_html=True)
+        st.markdown(f'<div class="mp-kpi-sm">{value}</div>', unsafe_allow_html=True)
         if help_text:
             st.caption(help_text)
         st.markdown("---")
@@ -59,23 +74,32 @@ def _safe_get(d: Dict[str, Any], key: str, default: Any = None):
     
 st.set_page_config(page_title="MindPulse • Dashboard", page_icon="🧠", layout="wide")
 
-_RISK_COLORS = {"Low": "#16a34a", "Moderate": "#f59e0b", "High": "#dc2626"}
-_LIFESTYLE_MAPS = {
-    "exercise": {"None": 0, "1-2 days/week": 3, "3-5 days/week": 6, "Daily": 9},
-    "diet": {"Poor": 2, "Average": 5, "Good": 7, "Excellent": 9},
-}
+# Lifestyle answers scaled to 0–10 for the lifestyle chart
+_LIFESTYLE_MAPS = MappingProxyType({
+    "exercise": MappingProxyType({"None": 0, "1-2 days/week": 3, "3-5 days/week": 6, "Daily": 9}),
+    "diet": MappingProxyType({"Poor": 2, "Average": 5, "Good": 7, "Excellent": 9}),
+})
 
-@st.cache_data(show_spinner=False)
-def _cached_load_user_inputs() -> Optional[pd.DataFrame]:
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cached_load_user_inputs(mtime: float) -> Optional[pd.DataFrame]:
+    """Normalized user inputs. `mtime` only keys the cache to the file version.
+
+    Shared by identity across reruns and sessions (no pickle copy per hit); callers derive
+    new frames from it and must not mutate it in place.
+    """
     try:
         df = load_user_inputs()
         if df is not None and not df.empty:
-            # Normalize
-            if "timestamp" in df.columns:
-                df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+            # Normalize (into a new frame: load_user_inputs() returns a shared cached object)
+            # Usually already typed by load_user_inputs(); only coerce columns that aren't
+            conv = {}
+            if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+                conv["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
             cols = [c for c in ["stress_level","anxiety_level","depression_level","sleep_hours"] if c in df.columns]
             for c in cols:
-                df[c] = pd.to_numeric(df[c], errors="coerce")
+                if not pd.api.types.is_numeric_dtype(df[c]):
+                    conv[c] = pd.to_numeric(df[c], errors="coerce")
+            df = df.assign(**conv)
         return df
     except Exception:
         return None
@@ -86,58 +110,62 @@ def _safe_session_name() -> str:
 
 
 # Risk model 
-def compute_risk_score(form_data):
-    def _num(x, default=0.0):
-        try:
-            return float(x)
-        except Exception:
-            return float(default)
-
-    # Base (your original)
-    s = _num(form_data.get("stress_level", 0))
-    a = _num(form_data.get("anxiety_level", 0))
-    d = _num(form_data.get("depression_level", 0))
+# Lifestyle nudges on top of the weighted base score, one table per answer (unlisted answers: 0)
+_EXERCISE_NUDGE = {"None": 0.2, "3-5 days/week": -0.2, "Daily": -0.2}
+_DIET_NUDGE = {"Poor": 0.2, "Good": -0.1, "Excellent": -0.1}
+_WLB_NUDGE = {"Poor": 0.3, "Good": -0.1, "Excellent": -0.1}
+_SOCIAL_NUDGE = {"Rarely": 0.2, "Often": -0.1, "Daily": -0.1}
+_CATEGORY_NUDGES = (
+    ("exercise_freq", _EXERCISE_NUDGE),
+    ("diet_quality", _DIET_NUDGE),
+    ("work_life_balance", _WLB_NUDGE),
+    ("social_interaction", _SOCIAL_NUDGE),
+)
+_YES_NUDGES = (("past_mental_illness", 0.2), ("current_medication", 0.1))
+
+
+@functools.lru_cache(maxsize=256)
+def _risk_kernel(s, a, d, sleep, exercise, diet, wlb, social, past_illness, medication):
+    """The scoring arithmetic on already-extracted answers; memoized, reruns repeat the same inputs."""
     score = s * 0.45 + a * 0.35 + d * 0.20
     nudges = 0.0
-    sleep = _num(form_data.get("sleep_hours", 0))
     if sleep < 6:
         nudges += 0.4
     elif 7 <= sleep <= 9:
         nudges -= 0.2
 
-    exercise = (form_data.get("exercise_freq") or "").strip()
-    if exercise in {"None"}:
-        nudges += 0.2
-    elif exercise in {"3-5 days/week", "Daily"}:
-        nudges -= 0.2
-
-    diet = (form_data.get("diet_quality") or "").strip()
-    if diet in {"Poor"}:
-        nudges += 0.2
-    elif diet in {"Good", "Excellent"}:
-        nudges -= 0.1
-
-    wlb = (form_data.get("work_life_balance") or "").strip()
-    if wlb in {"Poor"}:
-        nudges += 0.3
-    elif wlb in {"Good", "Excellent"}:
-        nudges -= 0.1
-
-    social = (form_data.get("social_interaction") or "").strip()
-    if social in {"Rarely"}:
-        nudges += 0.2
-    elif social in {"Often", "Daily"}:
-        nudges -= 0.1
-
-    if (form_data.get("past_mental_illness") or "") == "Yes":
-        nudges += 0.2
-    if (form_data.get("current_medication") or "") == "Yes":
-        nudges += 0.1
+    for answer, (_, table) in zip((exercise, diet, wlb, social), _CATEGORY_NUDGES):
+        nudges += table.get(answer, 0.0)
+    for answer, (_, bump) in zip((past_illness, medication), _YES_NUDGES):
+        if answer == "Yes":
+            nudges += bump
 
     score = score + max(-1.0, min(1.0, nudges))
     return round(max(0.0, min(10.0, score)), 1)
 
 
+def compute_risk_score(form_data):
+    def _num(x, default=0.0):
+        try:
+            return float(x)
+        except Exception:
+            return float(default)
+
+    def _text(key):
+        value = form_data.get(key) or ""
+        return value if isinstance(value, str) else str(value)
+
+    # Base (your original)
+    return _risk_kernel(
+        _num(form_data.get("stress_level", 0)),
+        _num(form_data.get("anxiety_level", 0)),
+        _num(form_data.get("depression_level", 0)),
+        _num(form_data.get("sleep_hours", 0)),
+        *(_text(col).strip() for col, _ in _CATEGORY_NUDGES),
+        *(_text(col) for col, _ in _YES_NUDGES),
+    )
+
+
 # ----------------- Form -----------------
 def mental_health_form():
     with st.form("mental_health_form", clear_on_submit=False):
@@ -249,6 +277,11 @@ def mental_health_form():
 
 
 # ----------------- Visualizations -----------------
+# Shared layout pieces (plotly copies them into each figure, so one instance serves all)
+_TIGHT_MARGIN = dict(l=20, r=20, t=60, b=20)
+_RADIAL_AXIS = dict(range=[0, 10], tickmode="linear", tick0=0, dtick=2)
+
+
 def radar_chart(form_data):
     categories = ["Stress", "Anxiety", "Depression"]
     values = [
@@ -262,23 +295,28 @@ def radar_chart(form_data):
     ))
     fig.update_layout(
         title="Emotional Radar",
-        polar=dict(radialaxis=dict(range=[0, 10], tickmode="linear", tick0=0, dtick=2)),
+        polar=dict(radialaxis=_RADIAL_AXIS),
         showlegend=False,
-        margin=dict(l=20, r=20, t=60, b=20),
+        margin=_TIGHT_MARGIN,
     )
     return fig
 
 
+def _lifestyle(form_data):
+    """(sleep hours, exercise, diet) with the categoricals scaled via _LIFESTYLE_MAPS."""
+    return (
+        float(form_data.get("sleep_hours", 0) or 0),
+        _LIFESTYLE_MAPS["exercise"].get(form_data.get("exercise_freq", ""), 0),
+        _LIFESTYLE_MAPS["diet"].get(form_data.get("diet_quality", ""), 5),
+    )
+
+
 def lifestyle_bar_chart(form_data):
-    exercise_map = {"None": 0, "1-2 days/week": 3, "3-5 days/week": 6, "Daily": 9}
-    diet_map = {"Poor": 2, "Average": 5, "Good": 7, "Excellent": 9}
+    # Also takes the _lifestyle() tuple, so the dashboard maps the answers only once
+    values = form_data if isinstance(form_data, tuple) else _lifestyle(form_data)
     data = {
         "Factor": ["Sleep Hours", "Exercise (scaled)", "Diet (scaled)"],
-        "Score": [
-            float(form_data.get("sleep_hours", 0)),
-            exercise_map.get(form_data.get("exercise_freq", ""), 0),
-            diet_map.get(form_data.get("diet_quality", ""), 5),
-        ],
+        "Score": list(values),
     }
     df = pd.DataFrame(data)
     fig = px.bar(
@@ -291,7 +329,7 @@ def lifestyle_bar_chart(form_data):
                   line=dict(width=0), fillcolor="rgba(86,180,233,0.12)", layer="below")
     fig.add_annotation(x=0.02, y=9.05, xref="paper", yref="y",
                        text="Recommended sleep range", showarrow=False, font=dict(size=10, color="#4b5563"))
-    fig.update_layout(margin=dict(l=20, r=20, t=60, b=20))
+    fig.update_layout(margin=_TIGHT_MARGIN)
     return fig
 
 
@@ -304,80 +342,325 @@ def emotional_pie(form_data):
     ]
     fig = px.pie(values=vals, names=labels, title="Emotional Distribution", hole=0.35)
     fig.update_traces(textposition="inside", textinfo="percent+label", hovertemplate="%{label}: %{value}/10<extra></extra>")
-    fig.update_layout(margin=dict(l=20, r=20, t=60, b=20))
+    fig.update_layout(margin=_TIGHT_MARGIN)
     return fig
 
 
+# Built once at import; risk_gauge copies it and only sets the value
+_GAUGE_TEMPLATE = go.Figure(go.Indicator(
+    mode="gauge+number",
+    value=0,
+    title={"text": "Overall Risk Score (0–10)"},
+    gauge={
+        "axis": {"range": [0, 10]},
+        "bar": {"thickness": 0.25},
+        "steps": [
+            {"range": [0, 4], "color": "#86efac"},
+            {"range": [4, 7], "color": "#fde68a"},
+            {"range": [7, 10], "color": "#fca5a5"},
+        ],
+    },
+    number={"suffix": " / 10"},
+))
+_GAUGE_TEMPLATE.update_layout(margin=_TIGHT_MARGIN)
+
+
 def risk_gauge(score):
-    score = float(score or 0)
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=score,
-        title={"text": "Overall Risk Score (0–10)"},
-        gauge={
-            "axis": {"range": [0, 10]},
-            "bar": {"thickness": 0.25},
-            "steps": [
-                {"range": [0, 4], "color": "#86efac"},
-                {"range": [4, 7], "color": "#fde68a"},
-                {"range": [7, 10], "color": "#fca5a5"},
-            ],
-        },
-        number={"suffix": " / 10"},
-    ))
-    fig.update_layout(margin=dict(l=20, r=20, t=60, b=20))
+    fig = go.Figure(_GAUGE_TEMPLATE)
+    fig.data[0].value = float(score or 0)
+    return fig
+
+
+# Cached figure builders, keyed on the few primitives each chart actually reads, so reruns
+# (section switches, widget changes) reuse the figure instead of rebuilding it. cache_resource
+# hands back the same object without a pickle round-trip; st.plotly_chart only reads it.
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _radar_fig(stress, anxiety, depression):
+    return radar_chart({"stress_level": stress, "anxiety_level": anxiety, "depression_level": depression})
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _pie_fig(stress, anxiety, depression):
+    return emotional_pie({"stress_level": stress, "anxiety_level": anxiety, "depression_level": depression})
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _lifestyle_fig(sleep_hours, exercise, diet):
+    return lifestyle_bar_chart((sleep_hours, exercise, diet))
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _gauge_fig(score):
+    return risk_gauge(score)
+
+
+def _levels(form_data):
+    # Floats, so 5 / 5.0 / "5" share one cache entry
+    return tuple(float(form_data.get(k, 0) or 0) for k in ("stress_level", "anxiety_level", "depression_level"))
+
+
+def _user_inputs_mtime() -> float:
+    """Cache key for the user inputs file version (raises OSError when it doesn't exist)."""
+    flush_pending(USER_INPUTS_FILE)  # queued submissions first, so the mtime reflects them
+    return os.path.getmtime(USER_INPUTS_FILE)
+
+
+# Points kept per trend trace; longer histories are LTTB-downsampled, so the figure JSON
+# sent to the browser stays bounded however long a user has been submitting
+TREND_POINTS = 1000
+_TREND_METRICS = ("stress_level", "anxiety_level", "depression_level")
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _user_index(mtime: float) -> dict:
+    """{lower-cased email: {"timestamp": datetime64[ns], <metric>: float64, ...}}, time-sorted.
+
+    Built in one pass per file version (`mtime` only keys the cache), so a user's trend is a
+    dict lookup into ready-made arrays instead of a lower-case + filter scan of every row.
+    """
+    df = _cached_load_user_inputs(mtime)
+    if df is None or df.empty or "email" not in df.columns or "timestamp" not in df.columns:
+        return {}
+    ts = pd.to_datetime(df["timestamp"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+    valid = ~np.isnat(ts)
+    codes, emails = pd.factorize(df["email"].astype(str).str.lower().to_numpy()[valid])
+    ts = ts[valid]
+    levels = {m: pd.to_numeric(df[m], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+              for m in _TREND_METRICS if m in df.columns}
+    # Group rows by user, by time within a user; then each user is one contiguous slice
+    order = np.lexsort((ts, codes))
+    bounds = np.searchsorted(codes[order], np.arange(len(emails) + 1))
+    index = {}
+    for i, email in enumerate(emails):
+        rows = order[bounds[i]:bounds[i + 1]]
+        rec = {"timestamp": ts[rows]}
+        rec.update((m, arr[rows]) for m, arr in levels.items())
+        index[email] = rec
+    return index
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _trend_fig(email: str, mtime: float) -> Optional[go.Figure]:
+    """Trend figure for a lower-cased email, once per file version (the LTTB pass included)."""
+    rec = _user_index(mtime).get(email)
+    if rec is None or len(rec["timestamp"]) < 2:
+        return None  # not enough points to show trend
+    # One WebGL trace per metric (canvas, not an SVG node per marker); long histories keep
+    # only the visually significant points of each metric (LTTB)
+    x = rec["timestamp"]
+    fig = go.Figure()
+    for metric in _TREND_METRICS:
+        if metric not in rec:
+            continue
+        y = rec[metric]
+        keep = lttb_indices(x.astype(np.int64), y, TREND_POINTS) if len(x) > TREND_POINTS else slice(None)
+        fig.add_trace(go.Scattergl(x=x[keep], y=y[keep], mode="lines+markers", name=metric))
+    fig.update_layout(title="Your mental health trend over time", legend_title_text="Metric")
+    fig.update_yaxes(range=[0, 10], dtick=2)
+    fig.update_traces(hovertemplate="%{x|%Y-%m-%d %H:%M}<br>%{fullData.name}: %{y}<extra></extra>")
+    fig.update_layout(margin=_TIGHT_MARGIN)
     return fig
 
 
 def trend_line_for_user(email):
     """If user has historical data, plot trend of stress/anxiety/depression over time."""
     try:
-        df_all = load_user_inputs()
-        if df_all is None or df_all.empty:
-            return None
-        # ensure timestamp parsed safely
-        df_all["timestamp"] = pd.to_datetime(df_all["timestamp"], errors="coerce")
-        df_user = (
-            df_all[df_all["email"].astype(str).str.lower() == str(email).lower()]
-            .dropna(subset=["timestamp"])
-            .sort_values("timestamp")
-        )
-        if df_user.shape[0] < 2:
-            return None  # not enough points to show trend
-        plot_df = df_user[["timestamp", "stress_level", "anxiety_level", "depression_level"]].melt(
-            id_vars="timestamp", var_name="Metric", value_name="Value"
-        )
-        fig = px.line(plot_df, x="timestamp", y="Value", color="Metric", markers=True,
-                      title="Your mental health trend over time")
-        fig.update_yaxes(range=[0, 10], dtick=2)
-        fig.update_traces(hovertemplate="%{x|%Y-%m-%d %H:%M}<br>%{fullData.name}: %{y}<extra></extra>")
-        fig.update_layout(margin=dict(l=20, r=20, t=60, b=20))
-        return fig
+        return _trend_fig(str(email).lower(), _user_inputs_mtime())
     except Exception:
         return None
 
 
+_CORR_COLS = ["stress_level", "anxiety_level", "depression_level", "sleep_hours"]
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _corr_matrix(mtime: float) -> Optional[np.ndarray]:
+    """Population correlation of _CORR_COLS, once per file version (`mtime` only keys the cache)."""
+    df_all = _cached_load_user_inputs(mtime)
+    if df_all is None or df_all.empty or df_all.shape[0] < 5:
+        return None
+    # One contiguous (N, 4) block of the columns of interest (already numeric in the normalized
+    # frame); levels and sleep hours are exact in float32, and corrcoef accumulates in float64
+    mat = np.column_stack([df_all[c].to_numpy(dtype=np.float32, na_value=np.nan) for c in _CORR_COLS])
+    mat = mat[~np.isnan(mat).any(axis=1)]
+    if len(mat) < 5:
+        return None
+    return np.corrcoef(mat, rowvar=False)
+
 
 def correlation_heatmap():
     """Show correlation heatmap if dataset has enough numeric data."""
     try:
-        df_all = load_user_inputs()
-        if df_all is None or df_all.empty or df_all.shape[0] < 5:
-            return None
-        # select numeric columns of interest
-        cols = ["stress_level", "anxiety_level", "depression_level", "sleep_hours"]
-        numeric = df_all[cols].apply(pd.to_numeric, errors="coerce").dropna()
-        if numeric.shape[0] < 5:
+        corr = _corr_matrix(_user_inputs_mtime())
+        if corr is None:
             return None
-        corr = numeric.corr()
-        fig = px.imshow(corr, text_auto=True, title="Correlation heatmap (population)",
+        fig = px.imshow(corr, x=_CORR_COLS, y=_CORR_COLS, text_auto=True,
+                        title="Correlation heatmap (population)",
                         color_continuous_scale="RdBu_r", zmin=-1, zmax=1,
                         labels=dict(color="r"))
-        fig.update_layout(margin=dict(l=20, r=20, t=60, b=20))
+        fig.update_layout(margin=_TIGHT_MARGIN)
         return fig
     except Exception:
         return None
 
+def _form_digest(form_data: Dict[str, Any]) -> str:
+    """Short digest of a submission's answers, to tell a changed form from a plain rerun."""
+    payload = json.dumps(form_data, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def _user_seed(key: str) -> int:
+    """Stable per-user seed (the builtin hash() of a str changes with every process)."""
+    return int.from_bytes(hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+@functools.lru_cache(maxsize=1024)
+def _suggestion_positions(seed: int, n_total: int) -> Tuple[int, ...]:
+    """Up to 3 distinct row positions out of `n_total`, the same for a seed across reruns and restarts."""
+    rng = np.random.default_rng(seed)
+    return tuple(rng.choice(n_total, size=min(3, n_total), replace=False).tolist())
+
+
+_SLEEP_TIPS = {
+    "short": "Short sleep (<6h) — consider a consistent bedtime routine.",
+    "good": "Good sleep range — positive for mood regulation.",
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _risk_explanations_cached(sleep_bin: str, ex: str, diet: str, social: str) -> Tuple[str, ...]:
+    """Tip bullets for one combination of the binned sleep and the lifestyle answers."""
+    expl = []
+    if sleep_bin in _SLEEP_TIPS:
+        expl.append(_SLEEP_TIPS[sleep_bin])
+    if ex == "None":
+        expl.append("Try light activity 2–3 times/week to help reduce stress.")
+    if diet == "Poor":
+        expl.append("Improving diet quality can support energy & mood.")
+    if social == "Rarely":
+        expl.append("Small social check-ins can be beneficial.")
+    return tuple(expl[:4])
+
+
+# Fragments (Streamlit >= 1.33) rerun on their own when a widget inside them changes; on older
+# versions this degrades to a plain function and the whole page reruns as before.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+
+@_fragment
+def _consent_fragment(form_data: Dict[str, Any], email: str, name: str, form_hash: str) -> None:
+    """Consent checkbox + save. Toggling it only reruns this fragment.
+
+    A submission is saved once: later reruns (downloads, section switches) see its digest in
+    mp_saved_hash and skip the write.
+    """
+    st.divider()
+    with st.container(border=True):
+        st.subheader("🔒 Consent & data use")
+        st.write(
+            "Your answers can be saved to generate trends for you. "
+            "You can export or delete them anytime from Settings."
+        )
+
+        # Widget defines and stores the key in session_state automatically.
+        consent = st.checkbox(
+            "I consent to save this submission for insights and reports.",
+            value=st.session_state.get("mp_consent", True),
+            key="mp_consent",
+        )
+
+        if consent:
+            try:
+                if st.session_state.get("mp_saved_hash") != form_hash:
+                    save_user_inputs(form_data, email=email, name=name)
+                    st.session_state["mp_saved_hash"] = form_hash
+                st.success("✅ Assessment submitted and saved.")
+            except Exception as e:
+                st.warning("We couldn't save your submission. Insights will still be shown for this session.")
+                st.info("Admins: ensure write permissions and CSV schema alignment.")
+                st.exception(e)
+        else:
+            st.info("Submission not saved. Insights will only persist for this session.")
+
+
+# st.download_button accepts a callable as `data` from Streamlit 1.52 on
+_DEFERRED_DOWNLOADS = tuple(int(p) for p in st.__version__.split(".")[:2]) >= (1, 52)
+
+# One text-report line per suggested professional (bound once instead of an f-string per row)
+_SUGGESTION_LINE = "\n - {} | {} | {}".format
+
+
+def _json_bytes(obj) -> bytes:
+    """`obj` as 2-space indented JSON, UTF-8 encoded (the download button takes bytes as-is)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
+@_fragment
+def _report_fragment(form_data: Dict[str, Any], name: str, email: str, risk_score: float, risk_label: str) -> None:
+    """Report section. A download click only reruns this fragment, not the whole dashboard."""
+    _get = form_data.get
+    st.subheader("📄 Downloadable Report")
+    now = datetime.now()  # one clock read: the report and all three file names agree
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    stamp = now.strftime("%Y%m%d_%H%M%S")
+    risk_score = st.session_state.get("mp_risk_score", risk_score)
+    risk_label = st.session_state.get("mp_risk_label", risk_label)
+    suggestions = st.session_state.get("_mp_suggestions", [])
+
+    # The payloads are only built when a button is clicked (callable `data`, run by Streamlit
+    # on its own thread); older Streamlit versions get them built up front as before
+    def _build_txt() -> bytes:
+        buf = io.StringIO()
+        w = buf.write
+        w(f"MindPulse Report - {timestamp}\n"
+          f"Name: {name}\n"
+          f"Email: {email}\n"
+          f"Risk Score: {risk_score:.1f} / 10 ({risk_label})\n"
+          "\n"
+          "Raw scores:\n"
+          f" - Stress: {_get('stress_level','N/A')}\n"
+          f" - Anxiety: {_get('anxiety_level','N/A')}\n"
+          f" - Depression: {_get('depression_level','N/A')}\n"
+          f" - Sleep hours: {_get('sleep_hours','N/A')}\n"
+          f" - Exercise frequency: {_get('exercise_freq','N/A')}\n"
+          f" - Diet quality: {_get('diet_quality','N/A')}\n"
+          "\n"
+          "Recommended professionals:")
+        try:
+            # Suggestions are always record dicts (from to_dict or the demo list): plain .get
+            w("".join([_SUGGESTION_LINE(p.get("name", ""), p.get("email", ""), p.get("phone", "")) for p in suggestions]))
+        except Exception:
+            pass
+        return buf.getvalue().encode("utf-8")
+
+    def _build_md() -> str:
+        return (
+            f"# MindPulse Report\n\n"
+            f"**Generated:** {timestamp}\n\n"
+            f"**Name:** {name}  \n"
+            f"**Email:** {email}  \n"
+            f"**Risk:** {risk_score:.1f}/10 — {risk_label}\n\n"
+            f"## Raw Scores\n"
+            f"- Stress: {_get('stress_level','N/A')}\n"
+            f"- Anxiety: {_get('anxiety_level','N/A')}\n"
+            f"- Depression: {_get('depression_level','N/A')}\n"
+            f"- Sleep hours: {_get('sleep_hours','N/A')}\n"
+        )
+
+    def _build_json() -> bytes:
+        return _json_bytes(
+            {"generated_at": timestamp, "name": name, "email": email, "risk_score": risk_score, "risk_label": risk_label, "form": form_data, "suggestions": suggestions},
+        )
+
+    txt, md, raw = (_build_txt, _build_md, _build_json) if _DEFERRED_DOWNLOADS else (_build_txt(), _build_md(), _build_json())
+
+    # Use stable keys so Streamlit recognizes the widgets across re-runs
+    st.download_button("Download text report", txt, file_name=f"mindpulse_report_{stamp}.txt", mime="text/plain", key="dl_txt")
+    st.download_button("Download Markdown report", md, file_name=f"mindpulse_report_{stamp}.md", mime="text/plain", key="dl_md")
+    st.download_button("Download JSON (raw)", raw, file_name=f"mindpulse_data_{stamp}.json", mime="application/json", key="dl_json")
+
 # ===================== Main Dashboard ===================== #
 
 def user_dashboard() -> None:
@@ -407,12 +690,9 @@ def user_dashboard() -> None:
         username = "there"
 
     st.markdown(
-        f"""
-        <div style="background:linear-gradient(45deg,#07293d,#c098cf);padding:14px;border-radius:12px;color:white;">
-          <div style="font-size:1.2rem;font-weight:700">👋 Welcome, {username}</div>
-          <div style="color:#c7d2fe;font-size:0.92rem">Complete the assessment below to receive insights, suggestions, and a downloadable report.</div>
-        </div>
-        """,
+        _DASHBOARD_CSS
+        + f'<div class="mp-hero"><div class="mp-hero-title">👋 Welcome, {username}</div>'
+        f'<div class="mp-hero-sub">{_HERO_SUB}</div></div>',
         unsafe_allow_html=True,
     )
 
@@ -435,6 +715,7 @@ def user_dashboard() -> None:
     # when user submits, store to session (prevents download/button rerun losing state)
     if form_data:
         st.session_state["mp_form"] = form_data
+        st.session_state.pop("mp_saved_hash", None)  # a fresh submit is saved even if the answers repeat
         st.session_state["mp_email"] = st.session_state.get("email", "")
         st.session_state["mp_name"] = st.session_state.get("name", username)
 
@@ -447,71 +728,43 @@ def user_dashboard() -> None:
     if not form_data:
         return
 
-    # 5) Consent & save (show once; user may opt out)
-    st.divider()
-    with st.container(border=True):
-        st.subheader("🔒 Consent & data use")
-        st.write(
-            "Your answers can be saved to generate trends for you. "
-            "You can export or delete them anytime from Settings."
-        )
-
-        # Widget defines and stores the key in session_state automatically.
-        consent = st.checkbox(
-            "I consent to save this submission for insights and reports.",
-            value=st.session_state.get("mp_consent", True),
-            key="mp_consent",
-        )
-
-        if consent:
-            try:
-                save_user_inputs(form_data, email=email, name=name)
-                st.success("✅ Assessment submitted and saved.")
-            except Exception as e:
-                st.warning("We couldn't save your submission. Insights will still be shown for this session.")
-                st.info("Admins: ensure write permissions and CSV schema alignment.")
-                st.exception(e)
-        else:
-            st.info("Submission not saved. Insights will only persist for this session.")
+    # form_data is a plain dict from here on: bind the fields the render path reads once
+    _get = form_data.get
+    form_hash = _form_digest(form_data)
+    stress = _get("stress_level", 0) or 0
+    anxiety = _get("anxiety_level", 0) or 0
+    depression = _get("depression_level", 0) or 0
 
+    # 5) Consent & save (show once; user may opt out)
+    _consent_fragment(form_data, email, name, form_hash)
 
     # 6) Risk score & label, with safe fallback
     def _risk_label(v: float) -> str:
         return "High" if v >= 7 else "Moderate" if v >= 4 else "Low"
 
-    try:
-        risk_score = float(compute_risk_score(form_data))  # type: ignore[name-defined]
-    except Exception:
-        stress = float(_safe_get(form_data, "stress_level", 0) or 0)
-        anxiety = float(_safe_get(form_data, "anxiety_level", 0) or 0)
-        depression = float(_safe_get(form_data, "depression_level", 0) or 0)
-        risk_score = float(min(10, round((stress + anxiety + depression) / 3, 1)))
-
-    risk_label = _risk_label(risk_score)
-    st.session_state["mp_risk_score"] = risk_score
-    st.session_state["mp_risk_label"] = risk_label
+    # Unchanged answers (most reruns): reuse the score and tips computed for them last time
+    fresh = st.session_state.get("mp_form_hash") != form_hash or "mp_risk_score" not in st.session_state
+    if fresh:
+        try:
+            risk_score = float(compute_risk_score(form_data))  # type: ignore[name-defined]
+        except Exception:
+            risk_score = float(min(10, round((float(stress) + float(anxiety) + float(depression)) / 3, 1)))
+        st.session_state["mp_risk_score"] = risk_score
+        st.session_state["mp_risk_label"] = _risk_label(risk_score)
+    risk_score = st.session_state["mp_risk_score"]
+    risk_label = st.session_state["mp_risk_label"]
 
     # create concise explanation bullets (mirrors compute_risk nudges if present)
     def _risk_explanations(fd: Dict[str, Any]) -> List[str]:
-        expl = []
         try:
-            sleep = float(_safe_get(fd, "sleep_hours", 0) or 0)
-            if sleep < 6:
-                expl.append("Short sleep (<6h) — consider a consistent bedtime routine.")
-            elif 7 <= sleep <= 9:
-                expl.append("Good sleep range — positive for mood regulation.")
-            ex = (fd.get("exercise_freq") or "").strip()
-            if ex == "None":
-                expl.append("Try light activity 2–3 times/week to help reduce stress.")
-            diet = (fd.get("diet_quality") or "").strip()
-            if diet == "Poor":
-                expl.append("Improving diet quality can support energy & mood.")
-            social = (fd.get("social_interaction") or "").strip()
-            if social == "Rarely":
-                expl.append("Small social check-ins can be beneficial.")
-        except Exception:
-            pass
-        return expl[:4]
+            sleep = float(fd.get("sleep_hours", 0) or 0)
+        except (TypeError, ValueError):
+            return []
+        # Coarse sleep bin, so float hours don't defeat the cache
+        sleep_bin = "short" if sleep < 6 else "good" if 7 <= sleep <= 9 else ""
+        return list(_risk_explanations_cached(
+            sleep_bin, *(str(fd.get(k) or "").strip() for k in ("exercise_freq", "diet_quality", "social_interaction"))
+        ))
 
     # 7) Summary KPIs & narrative
     st.subheader("📊 Summary")
@@ -524,14 +777,14 @@ def user_dashboard() -> None:
             st.metric("Risk Score", f"{risk_score:.1f} / 10")
     with c2:
         try:
-            _metric_card("Stress", str(_safe_get(form_data, "stress_level", "-")))
+            _metric_card("Stress", str(_get("stress_level", "-")))
         except Exception:
-            st.metric("Stress", str(_safe_get(form_data, "stress_level", "-")))
+            st.metric("Stress", str(_get("stress_level", "-")))
     with c3:
         try:
-            _metric_card("Sleep (hrs)", str(_safe_get(form_data, "sleep_hours", "-")))
+            _metric_card("Sleep (hrs)", str(_get("sleep_hours", "-")))
         except Exception:
-            st.metric("Sleep (hrs)", str(_safe_get(form_data, "sleep_hours", "-")))
+            st.metric("Sleep (hrs)", str(_get("sleep_hours", "-")))
     with c4:
         st.markdown("**Status**")
         try:
@@ -541,15 +794,15 @@ def user_dashboard() -> None:
         st.caption("Weighted from stress/anxiety/depression. Lifestyle nudges applied.")
 
     # quick domain insight
-    stress = _safe_get(form_data, "stress_level", 0) or 0
-    anxiety = _safe_get(form_data, "anxiety_level", 0) or 0
-    depression = _safe_get(form_data, "depression_level", 0) or 0
     top_domain = max([("Stress", stress), ("Anxiety", anxiety), ("Depression", depression)], key=lambda x: x[1])[0]
     st.info(f"Your strongest concern right now appears to be **{top_domain}**.")
 
     # risk explanation expander (concise)
     with st.expander("Why this score? (personalised tips)", expanded=True):
-        tips = _risk_explanations(form_data)
+        if fresh:
+            st.session_state["mp_tips"] = _risk_explanations(form_data)
+            st.session_state["mp_form_hash"] = form_hash
+        tips = st.session_state.get("mp_tips", [])
         if tips:
             for t in tips:
                 st.markdown(f"• {t}")
@@ -580,26 +833,27 @@ def user_dashboard() -> None:
         horizontal=True,
     )
 
-    # 9) Visualizations section
+    # 9) Visualizations section (the only place figures are built; other sections build none)
     if section == "Visualizations":
         try:
+            levels = _levels(form_data)
             col1, col2 = st.columns(2)
             with col1:
                 try:
-                    st.plotly_chart(radar_chart(form_data), use_container_width=True)  # type: ignore[name-defined]
+                    st.plotly_chart(_radar_fig(*levels), use_container_width=True)  # type: ignore[name-defined]
                 except Exception:
                     st.info("Radar unavailable.")
                 try:
-                    st.plotly_chart(emotional_pie(form_data), use_container_width=True)  # type: ignore[name-defined]
+                    st.plotly_chart(_pie_fig(*levels), use_container_width=True)  # type: ignore[name-defined]
                 except Exception:
                     pass
             with col2:
                 try:
-                    st.plotly_chart(lifestyle_bar_chart(form_data), use_container_width=True)  # type: ignore[name-defined]
+                    st.plotly_chart(_lifestyle_fig(*_lifestyle(form_data)), use_container_width=True)  # type: ignore[name-defined]
                 except Exception:
                     pass
                 try:
-                    st.plotly_chart(risk_gauge(risk_score), use_container_width=True)  # type: ignore[name-defined]
+                    st.plotly_chart(_gauge_fig(round(float(risk_score), 2)), use_container_width=True)  # type: ignore[name-defined]
                 except Exception:
                     st.progress(min(risk_score, 10) / 10.0, text="Risk gauge")
 
@@ -633,10 +887,9 @@ def user_dashboard() -> None:
             if not suggestions:
                 psych_df = load_psychologists()  # type: ignore[name-defined]
                 if psych_df is not None and getattr(psych_df, "empty", True) is False:
-                    rng = random.Random(abs(hash(email or name)) % (2**32 - 1))
-                    n = min(3, len(psych_df))
-                    idxs = rng.sample(range(len(psych_df)), k=n)
-                    suggestions = psych_df.iloc[idxs].to_dict(orient="records")
+                    # Sample positions only (O(k)) and take those rows from the shared cached table
+                    idxs = _suggestion_positions(_user_seed(email or name), len(psych_df))
+                    suggestions = psych_df.take(list(idxs)).to_dict(orient="records")
                     st.session_state["_mp_suggestions"] = suggestions
         except Exception as e:
             load_err = e
@@ -687,56 +940,7 @@ def user_dashboard() -> None:
 
     # 11) Report section (stable downloads that won't lose your state)
     if section == "Report":
-        st.subheader("📄 Downloadable Report")
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        risk_score = st.session_state.get("mp_risk_score", risk_score)
-        risk_label = st.session_state.get("mp_risk_label", risk_label)
-        suggestions = st.session_state.get("_mp_suggestions", [])
-
-        report_lines = [
-            f"MindPulse Report - {timestamp}",
-            f"Name: {name}",
-            f"Email: {email}",
-            f"Risk Score: {risk_score:.1f} / 10 ({risk_label})",
-            "",
-            "Raw scores:",
-            f" - Stress: {_safe_get(form_data,'stress_level','N/A')}",
-            f" - Anxiety: {_safe_get(form_data,'anxiety_level','N/A')}",
-            f" - Depression: {_safe_get(form_data,'depression_level','N/A')}",
-            f" - Sleep hours: {_safe_get(form_data,'sleep_hours','N/A')}",
-            f" - Exercise frequency: {_safe_get(form_data,'exercise_freq','N/A')}",
-            f" - Diet quality: {_safe_get(form_data,'diet_quality','N/A')}",
-            "",
-            "Recommended professionals:",
-        ]
-        try:
-            for p in suggestions:
-                report_lines.append(f" - {_safe_get(p,'name','')} | {_safe_get(p,'email','')} | {_safe_get(p,'phone','')}")
-        except Exception:
-            pass
-
-        txt = "\n".join(report_lines)
-        md = (
-            f"# MindPulse Report\n\n"
-            f"**Generated:** {timestamp}\n\n"
-            f"**Name:** {name}  \n"
-            f"**Email:** {email}  \n"
-            f"**Risk:** {risk_score:.1f}/10 — {risk_label}\n\n"
-            f"## Raw Scores\n"
-            f"- Stress: {_safe_get(form_data,'stress_level','N/A')}\n"
-            f"- Anxiety: {_safe_get(form_data,'anxiety_level','N/A')}\n"
-            f"- Depression: {_safe_get(form_data,'depression_level','N/A')}\n"
-            f"- Sleep hours: {_safe_get(form_data,'sleep_hours','N/A')}\n"
-        )
-        raw = json.dumps(
-            {"generated_at": timestamp, "name": name, "email": email, "risk_score": risk_score, "risk_label": risk_label, "form": form_data, "suggestions": suggestions},
-            indent=2,
-        )
-
-        # Use stable keys so Streamlit recognizes the widgets across re-runs
-        st.download_button("Download text report", txt, file_name=f"mindpulse_report_{datetime.now():%Y%m%d_%H%M%S}.txt", key="dl_txt")
-        st.download_button("Download Markdown report", md, file_name=f"mindpulse_report_{datetime.now():%Y%m%d_%H%M%S}.md", key="dl_md")
-        st.download_button("Download JSON (raw)", raw, file_name=f"mindpulse_data_{datetime.now():%Y%m%d_%H%M%S}.json", mime="application/json", key="dl_json")
+        _report_fragment(form_data, name, email, risk_score, risk_label)
 
     # 12) Feedback section
     if section == "Feedback":
@@ -746,7 +950,9 @@ def user_dashboard() -> None:
             feedback_long = st.text_area("Share detailed feedback or suggestions (optional)")
             submitted_fb = st.form_submit_button("Submit Feedback")
         if submitted_fb:
-            if (feedback_long or "").strip():
+            if (feedback_long or "").strip() and is_duplicate_feedback(st.session_state, email, feedback_long.strip()):
+                st.info("Already submitted — thank you!")
+            elif (feedback_long or "").strip():
                 try:
                     save_feedback(email, name, rating, feedback_long.strip())  # type: ignore[name-defined]
                     st.success("✅ Thanks for your feedback — it has been recorded.")
@@ -760,18 +966,11 @@ def user_dashboard() -> None:
             else:
                 st.warning("Please enter some feedback text before submitting.")
 
-    # 13) Delightful but subtle effects
-    try:
-        if risk_label == "Low":
-            st.balloons
-        elif risk_label == "Moderate":
-            st.balloons
-        elif risk_label == "High":
-            st.snow
-    except Exception as e:
-        # log or show admin info if you want to debug later
-        # st.write(f"Animation error: {e}")
-        pass
+    # 13) A small celebration for Low results only (never next to elevated-risk messaging),
+    # once per submission rather than on every widget interaction
+    if risk_label == "Low" and st.session_state.get("mp_celebrated") != form_hash:
+        st.session_state["mp_celebrated"] = form_hash
+        st.balloons()
 
 
     # end user_dashboard
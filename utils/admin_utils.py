@@ -1,6 +1,22 @@
 # utils/admin_utils.py
+import csv
+import functools
+import hashlib
+import io
+import json
 import os
+import tempfile
+import threading
 import pandas as pd
+import streamlit as st
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; the loaders fall back to pandas' C parser
+    pa = pacsv = pq = None
+from utils.csv_io import append_row, flush as flush_pending, keep_mode, rewriting
+from utils.user_utils import RISK_WEIGHTS, _weighted_risk, weighted_risk_column
 
 # Paths (keep consistent with other utils)
 DATA_DIR = "data"
@@ -9,8 +25,38 @@ USER_INPUTS_FILE = os.path.join(DATA_DIR, "user_inputs.csv")
 PSYCH_FILE = os.path.join(DATA_DIR, "psychologists.csv")
 FEEDBACK_FILE = os.path.join(DATA_DIR, "user_feedback.csv")  # same as user_utils
 
+# Column dtypes for admin CSV uploads (columns missing from a file are simply ignored)
+USERS_DTYPES = {"email": "string", "password": "string", "role": "string", "name": "string"}
+USER_INPUTS_DTYPES = {
+    "timestamp": "string", "email": "string", "name": "string", "age": "float64",
+    "gender": "string", "occupation": "string", "sleep_hours": "float64",
+    "exercise_freq": "string", "diet_quality": "string",
+    "stress_level": "float64", "anxiety_level": "float64", "depression_level": "float64",
+    "social_interaction": "string", "work_life_balance": "string", "coping_methods": "string",
+    "past_mental_illness": "string", "current_medication": "string", "medication_details": "string",
+    "feedback": "string", "risk": "float64",
+}
+FEEDBACK_DTYPES = {"timestamp": "string", "email": "string", "name": "string", "feedback": "string"}
+PSYCH_DTYPES = {
+    "name": "string", "email": "string", "phone": "string",
+    "specialization": "string", "specialty": "string", "booking_url": "string",
+}
+
+# Every loader/saver calls init_files(); the folder/file checks only need to happen once
+_INITED = False
+_INIT_LOCK = threading.Lock()
+
 def init_files():
-    """Create data folder and CSVs with sensible headers if they don't exist."""
+    """Create data folder and CSVs with sensible headers if they don't exist (once per process)."""
+    global _INITED
+    if _INITED:
+        return
+    with _INIT_LOCK:
+        if not _INITED:
+            _create_files()
+            _INITED = True
+
+def _create_files():
     os.makedirs(DATA_DIR, exist_ok=True)
 
     if not os.path.exists(USERS_FILE):
@@ -23,7 +69,7 @@ def init_files():
             "stress_level", "anxiety_level", "depression_level",
             "social_interaction", "work_life_balance", "coping_methods",
             "past_mental_illness", "current_medication", "medication_details",
-            "feedback"
+            "feedback", "risk"
         ]
         pd.DataFrame(columns=cols).to_csv(USER_INPUTS_FILE, index=False)
 
@@ -38,22 +84,209 @@ def init_files():
     if not os.path.exists(FEEDBACK_FILE):
         pd.DataFrame(columns=["timestamp", "email", "name", "rating", "feedback"]).to_csv(FEEDBACK_FILE, index=False)
 
+# ----------------- Normalizers -----------------
+@functools.lru_cache(maxsize=4096)
+def _normalize_email(value):
+    """Canonical stored form of an email (same as auth.register_user). Memoized: emails repeat a lot."""
+    return value.strip().lower() if isinstance(value, str) else value
+
+def _with_normalized_emails(df: pd.DataFrame) -> pd.DataFrame:
+    if "email" not in df.columns:
+        return df
+    return df.assign(email=df["email"].map(_normalize_email, na_action="ignore"))
+
 # ----------------- Loaders & Savers -----------------
+def _parquet_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".parquet"
+
+def _typed_user_inputs(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse the timestamp and numeric columns up front, so they are stored typed in the Parquet copy."""
+    # The Arrow reader usually hands these over typed already; only convert what isn't
+    conv = {}
+    if "timestamp" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["timestamp"]):
+        conv["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    for col in ("age", "sleep_hours", "stress_level", "anxiety_level", "depression_level", "risk"):
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            conv[col] = pd.to_numeric(df[col], errors="coerce")
+    return df.assign(**conv)
+
+# Per-file post-parse typing applied before the Parquet copy is written
+_CSV_TYPERS = {USER_INPUTS_FILE: _typed_user_inputs}
+
+# Declared column types per file, handed to the Arrow CSV reader
+_CSV_SCHEMAS = {
+    USERS_FILE: USERS_DTYPES, USER_INPUTS_FILE: USER_INPUTS_DTYPES,
+    PSYCH_FILE: PSYCH_DTYPES, FEEDBACK_FILE: FEEDBACK_DTYPES,
+}
+
+# Columns the Arrow reader parses as timestamps itself (a malformed value falls back to pandas)
+_CSV_TIMESTAMPS = {USER_INPUTS_FILE: ("timestamp",)}
+
+def _parse_csv(path: str, source=None) -> pd.DataFrame:
+    """Parse a data CSV with pyarrow's multi-threaded reader, falling back to pandas.
+
+    Columns with a declared type skip Arrow's type inference, and _CSV_TIMESTAMPS columns are
+    parsed to datetime64[us] in the same pass. The result is converted to ordinary
+    NumPy-backed columns, since the pages group and mask them with numpy. `source` (a binary
+    file object) is parsed instead of the file itself, with `path`'s schema.
+    """
+    if pacsv is not None:
+        column_types = {c: pa.type_for_alias(t) for c, t in _CSV_SCHEMAS.get(path, {}).items()}
+        column_types.update((c, pa.timestamp("us")) for c in _CSV_TIMESTAMPS.get(path, ()))
+        try:
+            tbl = pacsv.read_csv(
+                path if source is None else source,
+                read_options=pacsv.ReadOptions(block_size=8 << 20, use_threads=True),
+                convert_options=pacsv.ConvertOptions(
+                    column_types=column_types,
+                    timestamp_parsers=[pacsv.ISO8601],
+                    strings_can_be_null=True,
+                ),
+            )
+            return tbl.to_pandas()
+        except (pa.ArrowInvalid, ValueError, TypeError):
+            pass
+    if source is not None:
+        source.seek(0)
+    return pd.read_csv(path if source is None else source)
+
+# From this size on, a CSV that has only been appended to since its Parquet copy was written
+# has just the new rows parsed and added to that copy, instead of being re-parsed in full
+PARQUET_INCREMENTAL_MIN = 4 << 20
+_STAMP_KEY = b"mindpulse_csv"
+_STAMP_TAIL = 4096
+
+def _csv_stamp(path: str, file_stat) -> dict:
+    """Identity of the CSV contents a Parquet copy was made from: inode, size and last bytes.
+
+    Appends keep the inode and the earlier bytes; every rewrite (_atomic_to_csv, uploads,
+    the risk column upgrade) replaces the file, so it gets a new inode.
+    """
+    with open(path, "rb") as f:
+        f.seek(max(0, file_stat.st_size - _STAMP_TAIL))
+        tail = f.read(min(file_stat.st_size, _STAMP_TAIL))
+    return {"ino": file_stat.st_ino, "size": file_stat.st_size, "tail": hashlib.blake2b(tail, digest_size=16).hexdigest()}
+
+def _appended_since_copy(path: str, pq_path: str, file_stat):
+    """The Parquet copy plus the rows appended to the CSV since, or None to re-parse in full."""
+    if pq is None:
+        return None
+    try:
+        stamp = json.loads(pq.read_schema(pq_path).metadata[_STAMP_KEY])
+    except Exception:
+        return None
+    size = stamp.get("size", 0)
+    if stamp.get("ino") != file_stat.st_ino or not 0 < size <= file_stat.st_size:
+        return None
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(max(0, size - _STAMP_TAIL))
+        tail = f.read(min(size, _STAMP_TAIL))
+        if hashlib.blake2b(tail, digest_size=16).hexdigest() != stamp.get("tail"):
+            return None
+        f.seek(size)
+        added = f.read(file_stat.st_size - size)
+    df = pd.read_parquet(pq_path)
+    if not added.strip():
+        return df
+    new = _parse_csv(path, io.BytesIO(header + added))
+    typer = _CSV_TYPERS.get(path)
+    if typer is not None:
+        new = typer(new)
+    return pd.concat([df, new], ignore_index=True)
+
+@st.cache_resource(ttl=300, max_entries=16, show_spinner=False)
+def _read_csv_cached(path: str, mtime: float) -> pd.DataFrame:
+    """Load a data CSV. `mtime` is only part of the cache key, so a rewrite of the file invalidates it.
+
+    Cached as a shared resource: every caller gets the *same* DataFrame object, without the
+    pickle round-trip st.cache_data does on each hit. Callers must not mutate it in place;
+    use `.assign(...)` / `.copy()` to derive a modified frame.
+
+    The CSV stays the source of truth (auth and the user pages append to it directly), but a
+    snappy Parquet copy is kept next to it and stamped with the CSV's mtime; while the two
+    match, the much cheaper Parquet read is used instead of re-parsing the CSV. Files with an
+    entry in _CSV_TYPERS are typed before that copy is written, so they come back already typed.
+    Past PARQUET_INCREMENTAL_MIN bytes, a CSV that was only appended to is brought up to date
+    by parsing just the appended rows.
+    """
+    pq_path = _parquet_path(path)
+    st_csv = os.stat(path)
+    csv_ns = st_csv.st_mtime_ns
+    try:
+        st_pq = os.stat(pq_path)
+        # A copy whose permissions differ from the CSV's (e.g. written before they were copied
+        # over) is rewritten rather than left readable by more users than the CSV
+        if st_pq.st_mtime_ns == csv_ns and st_pq.st_mode == st_csv.st_mode:
+            return pd.read_parquet(pq_path)
+    except Exception:
+        pass  # missing or unreadable copy: fall back to the CSV
+
+    df = None
+    if st_csv.st_size >= PARQUET_INCREMENTAL_MIN:
+        try:
+            df = _appended_since_copy(path, pq_path, st_csv)
+        except Exception:
+            df = None
+    if df is None:
+        # Exactly the bytes the stamp describes, even if a row is appended meanwhile
+        with open(path, "rb") as f:
+            df = _parse_csv(path, io.BytesIO(f.read(st_csv.st_size)))
+        typer = _CSV_TYPERS.get(path)
+        if typer is not None:
+            df = typer(df)
+    tmp = pq_path + ".tmp"
+    try:
+        tbl = pa.Table.from_pandas(df, preserve_index=False)
+        stamp = json.dumps(_csv_stamp(path, st_csv)).encode("utf-8")
+        tbl = tbl.replace_schema_metadata({**(tbl.schema.metadata or {}), _STAMP_KEY: stamp})
+        pq.write_table(tbl, tmp, compression="snappy")
+        os.utime(tmp, ns=(csv_ns, csv_ns))
+        keep_mode(tmp, path)  # no wider access than the CSV: users.csv holds the passwords
+        os.replace(tmp, pq_path)
+    except Exception:
+        # The Parquet copy is only an accelerator (e.g. pyarrow may be missing)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return df
+
+def _read_csv(path: str) -> pd.DataFrame:
+    flush_pending(path)  # rows queued by the user pages must be on disk before the mtime check
+    return _read_csv_cached(path, os.path.getmtime(path))
+
+def _atomic_to_csv(df: pd.DataFrame, path: str) -> None:
+    """Write `df` to a temp file next to `path`, then rename it into place.
+
+    Readers never see a truncated, half-written CSV, and the temp file is written
+    sequentially through a 1 MB buffer.
+    """
+    # Queued rows are written first, and none can be appended to the old file until the rename
+    with rewriting(path):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with open(fd, "w", buffering=1 << 20, newline="", encoding="utf-8") as f:
+                df.to_csv(f, index=False, chunksize=100_000)
+            keep_mode(tmp, path)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
 def load_users():
     init_files()
     try:
-        return pd.read_csv(USERS_FILE)
+        return _read_csv(USERS_FILE)
     except Exception:
         return pd.DataFrame(columns=["email", "password", "role", "name"])
 
 def save_users(df: pd.DataFrame):
     init_files()
-    df.to_csv(USERS_FILE, index=False)
+    _atomic_to_csv(_with_normalized_emails(df), USERS_FILE)
 
 def load_user_inputs():
     init_files()
     try:
-        return pd.read_csv(USER_INPUTS_FILE)
+        return _read_csv(USER_INPUTS_FILE)
     except Exception:
         return pd.DataFrame(columns=[
             "timestamp", "email", "name", "age", "gender", "occupation",
@@ -61,27 +294,103 @@ def load_user_inputs():
             "stress_level", "anxiety_level", "depression_level",
             "social_interaction", "work_life_balance", "coping_methods",
             "past_mental_illness", "current_medication", "medication_details",
-            "feedback"
+            "feedback", "risk"
         ])
 
 def save_user_inputs(df: pd.DataFrame):
     init_files()
-    df.to_csv(USER_INPUTS_FILE, index=False)
+    if set(RISK_WEIGHTS).issubset(df.columns):
+        # Admin edits can change the levels; the stored risk must follow them
+        df = df.assign(risk=weighted_risk_column(df))
+    _atomic_to_csv(_with_normalized_emails(df), USER_INPUTS_FILE)
+
+def replace_user_inputs_from_csv(src) -> int:
+    """Copy an uploaded CSV (binary file object) over the user inputs file, row by row.
+
+    The admin upload only validates and re-writes rows, so this streams through the csv module
+    instead of building a DataFrame. Rows land in a temp file that is moved into place once the
+    whole upload has been checked.
+    """
+    init_files()
+    with rewriting(USER_INPUTS_FILE):
+        return _copy_user_inputs(src)
+
+def _copy_user_inputs(src) -> int:
+    text = io.TextIOWrapper(src, encoding="utf-8-sig", newline="")
+    tmp = None
+    rows = 0
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise ValueError("Uploaded CSV is empty.")
+        with tempfile.NamedTemporaryFile("w", dir=DATA_DIR, suffix=".tmp", newline="",
+                                         encoding="utf-8", delete=False) as tf:
+            tmp = tf.name
+            writer = csv.writer(tf)
+            n_fields = len(header)
+            email_idx = header.index("email") if "email" in header else None
+            # The risk column is recomputed from the levels rather than trusted from the upload
+            level_idx = {k: header.index(k) for k in RISK_WEIGHTS if k in header}
+            if len(level_idx) < len(RISK_WEIGHTS):
+                level_idx = None
+            elif "risk" not in header:
+                header = header + ["risk"]
+            risk_idx = header.index("risk") if level_idx else None
+            writer.writerow(header)
+            for lineno, row in enumerate(reader, start=2):
+                if not row:
+                    continue
+                if len(row) != n_fields:
+                    raise ValueError(f"Line {lineno} has {len(row)} fields, expected {n_fields}.")
+                if email_idx is not None:
+                    row[email_idx] = _normalize_email(row[email_idx])
+                if level_idx:
+                    risk = _weighted_risk({k: row[i] for k, i in level_idx.items()})
+                    if risk_idx == len(row):
+                        row.append(risk)
+                    else:
+                        row[risk_idx] = risk
+                writer.writerow(row)
+                rows += 1
+        keep_mode(tmp, USER_INPUTS_FILE)
+        os.replace(tmp, USER_INPUTS_FILE)
+        tmp = None
+    finally:
+        text.detach()  # leave the caller's upload open
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+    return rows
 
 def load_psychologists():
     init_files()
     try:
-        return pd.read_csv(PSYCH_FILE)
+        return _read_csv(PSYCH_FILE)
     except Exception:
         return pd.DataFrame(columns=["name", "specialization", "email", "phone"])
 
+def count_psychologists() -> int:
+    """Number of psychologist rows, counted with the csv module instead of building a DataFrame."""
+    init_files()
+    with open(PSYCH_FILE, newline="", encoding="utf-8") as f:
+        return max(0, sum(1 for row in csv.reader(f) if row) - 1)
+
 def save_psychologists(df: pd.DataFrame):
     init_files()
-    df.to_csv(PSYCH_FILE, index=False)
+    _atomic_to_csv(_with_normalized_emails(df), PSYCH_FILE)
 
 def append_psychologist(record: dict):
     """Append a single psychologist record (dict with keys name,specialization,email,phone)."""
     init_files()
+    with open(PSYCH_FILE, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    if header and set(record) <= set(header):
+        # One line appended to the file instead of re-writing it; written out right away since
+        # the admin page re-counts the file by mtime
+        append_row(PSYCH_FILE, {**record, "email": _normalize_email(record.get("email"))})
+        flush_pending(PSYCH_FILE)
+        return
+    # A field the file has no column for yet (e.g. booking_url on an older file): widen it
     df = load_psychologists()
     df = pd.concat([df, pd.DataFrame([record])], ignore_index=True)
     save_psychologists(df)
@@ -89,22 +398,21 @@ def append_psychologist(record: dict):
 def load_feedback():
     init_files()
     try:
-        return pd.read_csv(FEEDBACK_FILE)
+        return _read_csv(FEEDBACK_FILE)
     except Exception:
         return pd.DataFrame(columns=["timestamp", "email", "name", "rating", "feedback"])
 
 def save_feedback(df: pd.DataFrame):
     init_files()
-    df.to_csv(FEEDBACK_FILE, index=False)
+    _atomic_to_csv(df, FEEDBACK_FILE)
 
 def append_feedback(record: dict):
     """Append a single feedback record (dict with keys timestamp,email,name,rating,feedback)."""
     init_files()
-    df = load_feedback()
-    df = pd.concat([df, pd.DataFrame([record])], ignore_index=True)
-    save_feedback(df)
+    # Queued and appended to the file (aligned to its header) instead of re-writing the CSV
+    append_row(FEEDBACK_FILE, record)
 
 def clear_feedback():
     """Remove all feedback entries (admin action)."""
     init_files()
-    pd.DataFrame(columns=["timestamp", "email", "name", "rating", "feedback"]).to_csv(FEEDBACK_FILE, index=False)
+    _atomic_to_csv(pd.DataFrame(columns=["timestamp", "email", "name", "rating", "feedback"]), FEEDBACK_FILE)
@@ -1,40 +1,64 @@
 import random
+from collections import namedtuple
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 
+# Categorical answers scaled to 0–10 (shared with extra_visuals). Unknown answers, e.g. the
+# dashboard form's "1-2 days/week" wording, count as 0 instead of raising KeyError.
+_EXERCISE_MAP = {"Never": 0, "Rarely": 2, "Sometimes": 5, "Often": 7, "Daily": 10}
+_DIET_MAP = {"Poor": 2, "Average": 5, "Good": 8}
+
+# One form's chart inputs, categoricals already scaled
+ChartValues = namedtuple("ChartValues", "stress anxiety depression sleep exercise diet")
+
+def chart_values(form_data):
+    """ChartValues of one form dict (passed through unchanged when it already is one).
+
+    Every chart function here and in extra_visuals takes either a form dict or its ChartValues,
+    so a caller drawing several charts reads the answers and maps the categoricals once.
+    """
+    if isinstance(form_data, ChartValues):
+        return form_data
+    return ChartValues(
+        form_data["stress_level"],
+        form_data["anxiety_level"],
+        form_data["depression_level"],
+        # .get: the level-only charts (pie, line) are also drawn from partial forms
+        form_data.get("sleep_hours", 0),
+        _EXERCISE_MAP.get(form_data.get("exercise_freq"), 0),
+        _DIET_MAP.get(form_data.get("diet_quality"), 0),
+    )
+
 # --- Simulated ML prediction ---
-def analyze_mental_health(form_data):
-    """Fake analysis logic — replace with ML model later."""
-    # Weighted average score
+def analyze_mental_health_batch(df):
+    """Scores and risk labels for every row of `df` at once.
+
+    Same weights and thresholds as analyze_mental_health; the scores are returned unrounded.
+    """
     score = (
-        form_data["stress_level"] * 0.4 +
-        form_data["anxiety_level"] * 0.3 +
-        form_data["depression_level"] * 0.3
+        df["stress_level"].to_numpy(dtype=np.float64) * 0.4 +
+        df["anxiety_level"].to_numpy(dtype=np.float64) * 0.3 +
+        df["depression_level"].to_numpy(dtype=np.float64) * 0.3
     )
+    labels = np.where(score > 7, "High", np.where(score > 4, "Moderate", "Low"))
+    return score, labels
 
-    risk_level = "Low"
-    if score > 7:
-        risk_level = "High"
-    elif score > 4:
-        risk_level = "Moderate"
-
+def analyze_mental_health(form_data):
+    """Fake analysis logic — replace with ML model later."""
+    # One answer: plain float arithmetic, same expression and order as the batch path
+    stress, anxiety, depression = (float(v) for v in chart_values(form_data)[:3])
+    score = stress * 0.4 + anxiety * 0.3 + depression * 0.3
     return {
         "score": round(score, 2),
-        "risk_level": risk_level
+        "risk_level": "High" if score > 7 else "Moderate" if score > 4 else "Low"
     }
 
 # --- Visualization functions ---
 def radar_chart(form_data):
     categories = ["Stress", "Anxiety", "Depression", "Sleep", "Exercise", "Diet"]
-    values = [
-        form_data["stress_level"],
-        form_data["anxiety_level"],
-        form_data["depression_level"],
-        form_data["sleep_hours"],
-        {"Never": 0, "Rarely": 2, "Sometimes": 5, "Often": 7, "Daily": 10}[form_data["exercise_freq"]],
-        {"Poor": 2, "Average": 5, "Good": 8}[form_data["diet_quality"]]
-    ]
+    values = list(chart_values(form_data))
     fig = go.Figure()
     fig.add_trace(go.Scatterpolar(
         r=values,
@@ -50,24 +74,26 @@ def radar_chart(form_data):
 
 def pie_chart(form_data):
     labels = ["Stress", "Anxiety", "Depression"]
-    values = [form_data["stress_level"], form_data["anxiety_level"], form_data["depression_level"]]
+    values = list(chart_values(form_data)[:3])
     fig = px.pie(names=labels, values=values, title="Mental Health Distribution")
     return fig
 
 def line_chart(form_data):
     df = pd.DataFrame({
         "Category": ["Stress", "Anxiety", "Depression"],
-        "Score": [form_data["stress_level"], form_data["anxiety_level"], form_data["depression_level"]]
+        "Score": list(chart_values(form_data)[:3])
     })
     fig = px.line(df, x="Category", y="Score", markers=True, title="Mood Levels")
     return fig
 
 # --- Suggestion Generator ---
+_PROFESSIONALS = (
+    {"name": "Dr. Ayesha Khan", "email": "ayesha.khan@example.com", "phone": "+91 98765 43210"},
+    {"name": "Dr. Rajiv Mehta", "email": "rajiv.mehta@example.com", "phone": "+91 99887 66554"},
+    {"name": "Dr. Priya Sharma", "email": "priya.sharma@example.com", "phone": "+91 98123 45678"},
+    {"name": "Dr. Arjun Nair", "email": "arjun.nair@example.com", "phone": "+91 91234 56789"},
+)
+
 def random_psychologists():
-    professionals = [
-        {"name": "Dr. Ayesha Khan", "email": "ayesha.khan@example.com", "phone": "+91 98765 43210"},
-        {"name": "Dr. Rajiv Mehta", "email": "rajiv.mehta@example.com", "phone": "+91 99887 66554"},
-        {"name": "Dr. Priya Sharma", "email": "priya.sharma@example.com", "phone": "+91 98123 45678"},
-        {"name": "Dr. Arjun Nair", "email": "arjun.nair@example.com", "phone": "+91 91234 56789"},
-    ]
-    return random.sample(professionals, 2)
+    # Copies, so a caller editing a suggestion can't change the shared list
+    return [dict(p) for p in random.sample(_PROFESSIONALS, 2)]
@@ -1,42 +1,85 @@
 import csv
 import os
+import threading
 
 USERS_FILE = os.path.join("data", "users.csv")
 
+# In-memory index of users.csv: {email: [(password, role, name), ...]}, rebuilt when the
+# file's mtime changes and updated in place by register_user
+_USERS = {}
+_USERS_MTIME = None
+_USERS_LOCK = threading.Lock()
+
 def init_users_file():
     """Ensure the users.csv file exists with correct headers."""
     os.makedirs("data", exist_ok=True)
-    if not os.path.exists(USERS_FILE):
-        with open(USERS_FILE, mode="w", newline="", encoding="utf-8") as file:
+    try:
+        # "x" creates the file only if it is missing: no separate exists() check, and no race
+        # with another session creating it at the same time
+        with open(USERS_FILE, mode="x", newline="", encoding="utf-8") as file:
             writer = csv.writer(file)
             writer.writerow(["email", "password", "role", "name"])  # role: user/admin
+    except FileExistsError:
+        pass
+
+def _load_index():
+    users = {}
+    with open(USERS_FILE, mode="r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        header = next(reader, [])
+        try:
+            ie, ip, ir, iname = (header.index(c) for c in ("email", "password", "role", "name"))
+        except ValueError:
+            return users
+        width = max(ie, ip, ir, iname)
+        for row in reader:
+            if len(row) > width:
+                users.setdefault(row[ie].strip().lower(), []).append((row[ip], row[ir], row[iname]))
+    return users
+
+def _users_index():
+    """The users index for the current users.csv (None when the file doesn't exist)."""
+    global _USERS, _USERS_MTIME
+    try:
+        mtime_ns = os.stat(USERS_FILE).st_mtime_ns
+    except OSError:
+        return None
+    with _USERS_LOCK:
+        if _USERS_MTIME != mtime_ns:
+            _USERS = _load_index()
+            _USERS_MTIME = mtime_ns
+        return _USERS
 
 def register_user(email, password, name, role="user"):
     """Register a new user if email does not exist."""
+    global _USERS_MTIME
     init_users_file()
     if user_exists(email):
         return False, "User already exists!"
 
-    with open(USERS_FILE, mode="a", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow([email.strip().lower(), password, role, name])
+    email = email.strip().lower()
+    with _USERS_LOCK:
+        before = os.stat(USERS_FILE).st_mtime_ns
+        with open(USERS_FILE, mode="a", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow([email, password, role, name])
+        if _USERS_MTIME == before:
+            # The index was current: add the row to it instead of re-reading the file
+            _USERS.setdefault(email, []).append((password, role, name))
+            _USERS_MTIME = os.stat(USERS_FILE).st_mtime_ns
     return True, "Registration successful!"
 
 def user_exists(email):
     """Check if the user email already exists."""
-    if not os.path.exists(USERS_FILE):
-        return False
-    with open(USERS_FILE, mode="r", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        return any(row["email"].strip().lower() == email.strip().lower() for row in reader)
+    users = _users_index()
+    return users is not None and email.strip().lower() in users
 
 def authenticate_user(email, password):
     """Validate user credentials. Returns (role, name) if valid else None."""
-    if not os.path.exists(USERS_FILE):
+    users = _users_index()
+    if users is None:
         return None
-    with open(USERS_FILE, mode="r", encoding="utf-8") as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row["email"].strip().lower() == email.strip().lower() and row["password"] == password:
-                return row["role"], row["name"]
+    for stored, role, name in users.get(email.strip().lower(), ()):
+        if stored == password:
+            return role, name
     return None
@@ -0,0 +1,236 @@
+# utils/csv_io.py
+import atexit
+import csv
+import io
+import os
+import stat
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Rows appended in this process but not yet on disk, per absolute CSV path. A background
+# thread writes them out once a file has FLUSH_EVERY queued or the oldest has waited
+# FLUSH_INTERVAL seconds, whichever comes first.
+FLUSH_EVERY = 32
+FLUSH_INTERVAL = 0.2
+# Background attempts at a batch that keeps failing before the flusher leaves it to the callers
+MAX_RETRIES = 5
+_PENDING = defaultdict(list)
+# Last write error and failed attempts per path, until a write of that path succeeds
+_ERRORS = {}
+_FAILURES = defaultdict(int)
+# Reentrant, so flush()/append_row() stay usable inside a rewriting() block
+_LOCK = threading.RLock()
+_WAKE = threading.Condition(_LOCK)
+_flusher = None
+
+
+def _key(path: str) -> str:
+    return os.path.abspath(path)
+
+
+_SPECIAL = frozenset(',"\r\n')
+
+
+def _format_row(values: list) -> str:
+    """One CSV line, byte-identical to csv.writer's output.
+
+    Most submissions are short numbers and plain words, which are simply joined; only a row
+    with a comma, quote or newline in some field goes through csv.writer for quoting.
+    """
+    fields = ["" if v is None else str(v) for v in values]
+    if any(not _SPECIAL.isdisjoint(f) for f in fields):
+        buf = io.StringIO()
+        csv.writer(buf).writerow(fields)
+        return buf.getvalue()
+    return ",".join(fields) + "\r\n"
+
+
+def _write_rows(path: str, rows: list) -> None:
+    """Append dict rows to `path` in one batch, aligned to the file's own header."""
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), None)
+    with open(path, "a", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        if not header:
+            header = list(rows[0].keys())
+            f.write(_format_row(header))
+        f.write("".join(_format_row([row.get(c) for c in header]) for row in rows))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _write_queued(key: str) -> None:
+    """Write out the rows queued for `key` (caller holds _LOCK), recording a failure."""
+    rows = _PENDING.get(key)
+    if not rows:
+        return
+    try:
+        _write_rows(key, rows)
+    except OSError as exc:
+        _ERRORS[key] = exc
+        _FAILURES[key] += 1
+        raise
+    rows.clear()
+    _ERRORS.pop(key, None)
+    _FAILURES.pop(key, None)
+
+
+def _retryable(key: str) -> bool:
+    return bool(_PENDING.get(key)) and _FAILURES.get(key, 0) < MAX_RETRIES
+
+
+def _write_pending() -> None:
+    """Background round: write out every batch that hasn't used up its retries.
+
+    A failed batch stays queued. After MAX_RETRIES failed rounds, only callers retry it:
+    append_row() and flush() for that path, which raise the error when it persists.
+    """
+    for key in list(_PENDING):
+        if _retryable(key):
+            try:
+                _write_queued(key)
+            except OSError:
+                pass
+
+
+def _flush_loop() -> None:
+    with _WAKE:
+        while True:
+            while not any(_retryable(key) for key in _PENDING):
+                _WAKE.wait()
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while True:
+                left = deadline - time.monotonic()
+                # A full batch goes out early, unless it is one that just failed
+                if left <= 0 or any(len(rows) >= FLUSH_EVERY and key not in _ERRORS
+                                    for key, rows in _PENDING.items()):
+                    break
+                _WAKE.wait(left)
+            _write_pending()
+
+
+def append_row(path: str, row: dict) -> None:
+    """Queue one row for `path` and return; the background flusher writes it out.
+
+    Anything that reads or rewrites `path` must call flush(path) first, so queued
+    rows are never missed or overwritten. Whatever is left is written at exit.
+
+    While an earlier batch for `path` failed to write, the row is written right away
+    together with it instead; if that fails too, the row is dropped and the OSError
+    raised, so the caller can report the save as failed.
+    """
+    global _flusher
+    key = _key(path)
+    with _WAKE:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="csv-flusher", daemon=True)
+            _flusher.start()
+        rows = _PENDING[key]
+        rows.append(row)
+        if key in _ERRORS:
+            try:
+                _write_queued(key)
+            except OSError:
+                rows.pop()
+                raise
+            return
+        if len(rows) == 1 or len(rows) >= FLUSH_EVERY:
+            _WAKE.notify()
+
+
+def flush(path: str) -> None:
+    """Write out the rows still queued for `path` (no-op when there are none).
+
+    Raises the OSError when they can't be written; they stay queued.
+    """
+    with _LOCK:
+        _write_queued(_key(path))
+
+
+def keep_mode(tmp: str, path: str) -> None:
+    """Give `tmp` the permissions of the file it is about to replace (temp files are 0600)."""
+    try:
+        os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def rewriting(path: str):
+    """Write out the rows queued for `path`, then hold the queue lock until the block ends.
+
+    For code that replaces `path` (temp file + os.replace): without the lock, a row queued
+    between the flush and the rename is appended to the old file and lost with it.
+    """
+    with _LOCK:
+        _write_queued(_key(path))
+        yield
+
+
+def flush_all() -> None:
+    """Write out every queued batch; raises the first error after trying them all."""
+    error = None
+    with _LOCK:
+        for key in list(_PENDING):
+            try:
+                _write_queued(key)
+            except OSError as exc:
+                error = error or exc
+    if error is not None:
+        raise error
+
+
+def _records_backwards(f, block: int):
+    """Raw CSV records of an open binary file, last record first, header excluded.
+
+    A newline only ends a record when the bytes after it hold an even number of quote
+    characters, so quoted fields with embedded newlines stay in one record.
+    """
+    pos = f.seek(0, os.SEEK_END)
+    rest = b""
+    while pos > 0:
+        step = min(block, pos)
+        pos -= step
+        f.seek(pos)
+        rest = f.read(step) + rest
+        cut = hi = len(rest)
+        while True:
+            i = rest.rfind(b"\n", 0, hi)
+            if i < 0:
+                break
+            if rest.count(b'"', i + 1, cut) % 2 == 0:
+                record = rest[i + 1:cut].rstrip(b"\r")
+                if record:
+                    yield record
+                cut = i
+            hi = i
+        rest = rest[:cut]
+    # What is left at offset 0 is the header line
+
+
+def tail_rows(path: str, n: int, where=None, block: int = 1 << 16) -> list:
+    """Last `n` rows of a CSV as dicts (oldest first), reading backwards from the end.
+
+    Only as many 64 KB blocks are read as it takes to find `n` rows for which `where(row)`
+    holds, so the cost follows the size of the answer rather than the size of the file.
+    """
+    flush(path)
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), None)
+    if not header or n <= 0:
+        return []
+    out = []
+    with open(path, "rb") as f:
+        for record in _records_backwards(f, block):
+            values = next(csv.reader(io.StringIO(record.decode("utf-8"), newline="")), [])
+            row = dict(zip(header, values))
+            if where is None or where(row):
+                out.append(row)
+                if len(out) >= n:
+                    break
+    out.reverse()
+    return out
+
+
+atexit.register(flush_all)
@@ -1,17 +1,11 @@
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from utils.analysis import chart_values
 
 def bar_chart(form_data):
-    factors = {
-        "Stress": form_data["stress_level"],
-        "Anxiety": form_data["anxiety_level"],
-        "Depression": form_data["depression_level"],
-        "Sleep Quality": form_data["sleep_hours"],
-        "Exercise": {"Never": 0, "Rarely": 2, "Sometimes": 5, "Often": 7, "Daily": 10}[form_data["exercise_freq"]],
-        "Diet": {"Poor": 2, "Average": 5, "Good": 8}[form_data["diet_quality"]]
-    }
-    df = pd.DataFrame(list(factors.items()), columns=["Factor", "Score"])
+    factors = ["Stress", "Anxiety", "Depression", "Sleep Quality", "Exercise", "Diet"]
+    df = pd.DataFrame({"Factor": factors, "Score": list(chart_values(form_data))})
     return px.bar(df, x="Factor", y="Score", title="Wellness Factors Comparison", color="Factor", text="Score")
 
 def gauge_chart(score):
@@ -35,11 +29,11 @@ def gauge_chart(score):
 def stacked_area_chart(form_data):
     df = pd.DataFrame({
         "Factor": ["Stress", "Anxiety", "Depression"],
-        "Score": [form_data["stress_level"], form_data["anxiety_level"], form_data["depression_level"]],
+        "Score": list(chart_values(form_data)[:3]),
         "Day": [1, 1, 1]  # Static for now, can be replaced with time-series data
     })
     return px.area(df, x="Day", y="Score", color="Factor", title="Cumulative Mental Health Factors")
 
 def histogram_sleep(form_data):
-    df = pd.DataFrame({"Sleep Hours": [form_data["sleep_hours"]] * 10})  # replicate for visual
+    df = pd.DataFrame({"Sleep Hours": [chart_values(form_data).sleep] * 10})  # replicate for visual
     return px.histogram(df, x="Sleep Hours", nbins=5, title="Sleep Hours Distribution")
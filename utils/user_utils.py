@@ -1,57 +1,141 @@
 # utils/user_utils.py
+import csv
+import hashlib
 import os
+import tempfile
+import threading
+import time
 import pandas as pd
 from datetime import datetime
+from utils.csv_io import append_row, keep_mode, rewriting
 
 USER_INPUTS_FILE = os.path.join("data", "user_inputs.csv")
 FEEDBACK_FILE = os.path.join("data", "user_feedback.csv")
 
+# CSV headers; appended rows are aligned to the file's own header (see utils.csv_io)
+INPUT_COLUMNS = (
+    "timestamp", "email", "name", "age", "gender", "occupation",
+    "sleep_hours", "exercise_freq", "diet_quality",
+    "stress_level", "anxiety_level", "depression_level",
+    "social_interaction", "work_life_balance", "coping_methods",
+    "past_mental_illness", "current_medication", "medication_details",
+    "feedback", "risk",
+)
+FEEDBACK_COLUMNS = ("timestamp", "email", "name", "rating", "feedback")
+# The answers copied as-is from a submitted form (INPUT_COLUMNS between name and feedback)
+INPUT_FIELDS = INPUT_COLUMNS[3:-2]
+
+# Same weighting as the admin dashboard's risk (0–10), stored with each submission
+RISK_WEIGHTS = {"stress_level": 0.45, "anxiety_level": 0.35, "depression_level": 0.20}
+
+# init_files() runs on every dashboard rerun; the folder/file checks only need to happen once
+_INITED = False
+_INIT_LOCK = threading.Lock()
+
 def init_files():
-    """Create data folder and CSVs with headers if not present."""
+    """Create data folder and CSVs with headers if not present (once per process)."""
+    global _INITED
+    if _INITED:
+        return
+    with _INIT_LOCK:
+        if not _INITED:
+            _create_files()
+            _INITED = True
+
+def _create_files():
     os.makedirs("data", exist_ok=True)
 
     if not os.path.exists(USER_INPUTS_FILE):
-        cols = [
-            "timestamp", "email", "name", "age", "gender", "occupation",
-            "sleep_hours", "exercise_freq", "diet_quality",
-            "stress_level", "anxiety_level", "depression_level",
-            "social_interaction", "work_life_balance", "coping_methods",
-            "past_mental_illness", "current_medication", "medication_details",
-            "feedback"
-        ]
-        pd.DataFrame(columns=cols).to_csv(USER_INPUTS_FILE, index=False)
+        pd.DataFrame(columns=list(INPUT_COLUMNS)).to_csv(USER_INPUTS_FILE, index=False)
 
     if not os.path.exists(FEEDBACK_FILE):
-        pd.DataFrame(columns=["timestamp", "email", "name", "rating", "feedback"]).to_csv(FEEDBACK_FILE, index=False)
+        pd.DataFrame(columns=list(FEEDBACK_COLUMNS)).to_csv(FEEDBACK_FILE, index=False)
+
+def _weighted_risk(form_data: dict):
+    """Weighted 0–10 risk of one submission, or None when a level is missing/non-numeric."""
+    try:
+        total = sum(w * float(form_data.get(k)) for k, w in RISK_WEIGHTS.items())
+    except (TypeError, ValueError):
+        return None
+    return round(min(10.0, max(0.0, total)), 2)
+
+def weighted_risk_column(df: pd.DataFrame) -> pd.Series:
+    """_weighted_risk for every row of `df` (NaN where a level is missing/non-numeric)."""
+    levels = df[list(RISK_WEIGHTS)].apply(pd.to_numeric, errors="coerce")
+    return (levels * pd.Series(RISK_WEIGHTS)).sum(axis=1, min_count=3).clip(0, 10).round(2)
+
+# (st_dev, st_ino) of the user inputs file last seen with a risk column. Appends keep the
+# inode and every rewrite replaces it, so the header only needs re-reading for a new file.
+_RISK_CHECKED = None
+
+def _ensure_risk_column():
+    """One-off upgrade of a user inputs file written before the risk column existed.
+
+    Streams the rows through the csv module and appends a risk field to each, so every
+    other value is copied as written (pandas would read e.g. an exercise answer "None" as NaN).
+    """
+    global _RISK_CHECKED
+    st_in = os.stat(USER_INPUTS_FILE)
+    if _RISK_CHECKED == (st_in.st_dev, st_in.st_ino):
+        return
+    with rewriting(USER_INPUTS_FILE):
+        with open(USER_INPUTS_FILE, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            if "risk" in header or not set(RISK_WEIGHTS).issubset(header):
+                st_in = os.fstat(f.fileno())
+                _RISK_CHECKED = (st_in.st_dev, st_in.st_ino)
+                return
+            level_idx = {k: header.index(k) for k in RISK_WEIGHTS}
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(USER_INPUTS_FILE) or ".", suffix=".tmp")
+            try:
+                with open(fd, "w", buffering=1 << 20, newline="", encoding="utf-8") as out:
+                    writer = csv.writer(out)
+                    writer.writerow(header + ["risk"])
+                    for row in reader:
+                        if not row:
+                            continue
+                        row += [""] * (len(header) - len(row))
+                        levels = {k: row[i] for k, i in level_idx.items()}
+                        writer.writerow(row + [_weighted_risk(levels)])
+                keep_mode(tmp, USER_INPUTS_FILE)
+                os.replace(tmp, USER_INPUTS_FILE)
+            except BaseException:
+                os.remove(tmp)
+                raise
+        # The rename kept the temp file's inode
+        st_in = os.stat(USER_INPUTS_FILE)
+        _RISK_CHECKED = (st_in.st_dev, st_in.st_ino)
 
 def save_user_inputs(form_data: dict, email: str = None, name: str = None):
     init_files()
+    _ensure_risk_column()  # per save (a stat, once per file): the admin can replace the file
 
     row = {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "email": email or form_data.get("email", ""),
         "name": name or form_data.get("name", ""),
-        "age": form_data.get("age"),
-        "gender": form_data.get("gender"),
-        "occupation": form_data.get("occupation"),
-        "sleep_hours": form_data.get("sleep_hours"),
-        "exercise_freq": form_data.get("exercise_freq"),
-        "diet_quality": form_data.get("diet_quality"),
-        "stress_level": form_data.get("stress_level"),
-        "anxiety_level": form_data.get("anxiety_level"),
-        "depression_level": form_data.get("depression_level"),
-        "social_interaction": form_data.get("social_interaction"),
-        "work_life_balance": form_data.get("work_life_balance"),
-        "coping_methods": form_data.get("coping_methods"),
-        "past_mental_illness": form_data.get("past_mental_illness"),
-        "current_medication": form_data.get("current_medication"),
-        "medication_details": form_data.get("medication_details"),
-        "feedback": form_data.get("feedback", "")
+        **{k: form_data.get(k) for k in INPUT_FIELDS},
+        "feedback": form_data.get("feedback", ""),
+        "risk": _weighted_risk(form_data),
     }
 
-    df = pd.read_csv(USER_INPUTS_FILE)
-    df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    df.to_csv(USER_INPUTS_FILE, index=False)
+    # Queued and appended in batches (aligned to the file's header) instead of re-writing the CSV
+    append_row(USER_INPUTS_FILE, row)
+
+def is_duplicate_feedback(state, email: str, text: str, ttl: float = 10.0) -> bool:
+    """True when `state` (a session dict) saw the same email + text within `ttl` seconds.
+
+    Otherwise the submission's digest is recorded and False is returned, so a double-clicked
+    submit only writes one row.
+    """
+    digest = hashlib.blake2b(f"{email}|{text}".encode("utf-8"), digest_size=16).digest()
+    now = time.monotonic()
+    last = state.get("_last_feedback")
+    if last and last[0] == digest and now - last[1] < ttl:
+        return True
+    state["_last_feedback"] = (digest, now)
+    return False
 
 def save_feedback(email: str, name: str, rating: int, feedback_text: str):
     """Append feedback to feedback CSV and also a short entry in user_inputs feedback column (optional)."""
@@ -63,9 +147,7 @@ def save_feedback(email: str, name: str, rating: int, feedback_text: str):
         "rating": rating,
         "feedback": feedback_text
     }
-    fb_df = pd.read_csv(FEEDBACK_FILE)
-    fb_df = pd.concat([fb_df, pd.DataFrame([fb_row])], ignore_index=True)
-    fb_df.to_csv(FEEDBACK_FILE, index=False)
+    append_row(FEEDBACK_FILE, fb_row)
 
     # Optionally also append the feedback summary to the user_inputs file for cross reference
     # try: